@@ -0,0 +1,225 @@
+# Profiles the parser's prediction decisions on a corpus: for each decision of each rule the number of
+# predictions, their time and lookahead, how often SLL prediction failed over to full context (LL) and
+# at what cost, the ambiguities and context sensitivities, and samples of the input behind them
+#
+#   python -m benchmarks.decisions [--corpus corpus.atf | --texts N ...] [--sll] [--tree-free] [--dfa PATH] [--top N] [--samples N] [--output decisions.json]
+
+import argparse
+import collections
+import json
+import time
+
+from antlr4.atn.ParserATNSimulator import ParserATNSimulator
+
+from writingsumerianparser.dfa import loadDFA
+from writingsumerianparser.parser import parsers, readTexts, scanLines, walk
+
+from . import generate
+
+
+class Decision:
+
+    def __init__(self):
+        self.predictions = 0
+        self.seconds = 0.0
+        self.sllLook = 0
+        self.sllMaxLook = 0
+        self.fullContext = 0
+        self.llLook = 0
+        self.llMaxLook = 0
+        self.llSeconds = 0.0
+        self.ambiguities = 0
+        self.contextSensitivities = 0
+        self.errors = 0
+        # DFA states computed from the ATN, the rest of the lookahead is read from the cached DFA
+        self.atnTransitions = 0
+        self.samples = []
+
+
+class ProfilingSimulator(ParserATNSimulator):
+    # The parser's simulator, sharing its DFA, recording each prediction into the decision it was made for
+
+    def __init__(self, parser, samples=3):
+        interp = parser._interp
+        super().__init__(parser, interp.atn, interp.decisionToDFA, interp.sharedContextCache)
+        self.predictionMode = interp.predictionMode
+        self.decisions = collections.defaultdict(Decision)
+        self.samples = samples
+        self.identifier = None
+        self.content = []
+        self.lineNos = []
+        self.current = None
+        self.failedOver = False
+
+    def adaptivePredict(self, input, decision, outerContext):
+        current = self.current = self.decisions[decision]
+        self.failedOver = False
+        t = time.perf_counter()
+        try:
+            return super().adaptivePredict(input, decision, outerContext)
+        except:
+            current.errors += 1
+            raise
+        finally:
+            current.predictions += 1
+            current.seconds += time.perf_counter() - t
+
+    def execATN(self, dfa, s0, input, startIndex, outerContext):
+        try:
+            return super().execATN(dfa, s0, input, startIndex, outerContext)
+        finally:
+            if not self.failedOver:
+                self.look('sll', input.index - startIndex + 1)
+
+    def execATNWithFullContext(self, dfa, D, s0, input, startIndex, outerContext):
+        t = time.perf_counter()
+        try:
+            return super().execATNWithFullContext(dfa, D, s0, input, startIndex, outerContext)
+        finally:
+            self.current.llSeconds += time.perf_counter() - t
+            self.look('ll', input.index - startIndex + 1)
+
+    def computeTargetState(self, dfa, previousD, t):
+        self.current.atnTransitions += 1
+        return super().computeTargetState(dfa, previousD, t)
+
+    def look(self, mode, n):
+        current = self.current
+        setattr(current, mode+'Look', getattr(current, mode+'Look') + n)
+        setattr(current, mode+'MaxLook', max(getattr(current, mode+'MaxLook'), n))
+
+    def sample(self, kind, startIndex, stopIndex):
+        samples = self.current.samples
+        if sum(1 for x in samples if x['kind'] == kind) < self.samples:
+            stream = self.parser.getTokenStream()
+            line = stream.get(startIndex).line - 1
+            samples.append({
+                'kind': kind,
+                'identifier': self.identifier,
+                'line': self.lineNos[line] + 1 if line < len(self.lineNos) else None,
+                'input': stream.getText(startIndex, stopIndex).replace('\n', r'\n'),
+                'content': self.content[line] if line < len(self.content) else None
+            })
+
+    def reportAttemptingFullContext(self, dfa, conflictingAlts, configs, startIndex, stopIndex):
+        self.failedOver = True
+        self.current.fullContext += 1
+        self.look('sll', stopIndex - startIndex + 1)
+        self.sample('full context', startIndex, stopIndex)
+        super().reportAttemptingFullContext(dfa, conflictingAlts, configs, startIndex, stopIndex)
+
+    def reportContextSensitivity(self, dfa, prediction, configs, startIndex, stopIndex):
+        self.current.contextSensitivities += 1
+        self.sample('context sensitivity', startIndex, stopIndex)
+        super().reportContextSensitivity(dfa, prediction, configs, startIndex, stopIndex)
+
+    def reportAmbiguity(self, dfa, D, startIndex, stopIndex, exact, ambigAlts, configs):
+        self.current.ambiguities += 1
+        self.sample('ambiguity', startIndex, stopIndex)
+        super().reportAmbiguity(dfa, D, startIndex, stopIndex, exact, ambigAlts, configs)
+
+
+def profile(texts, sll=False, tree=True, tokenizer='antlr', samples=3):
+    # Texts are parsed as by parseLines, with the simulator swapped into the pooled parser meanwhile
+    _, _, parser = parsers.get('', tree, tokenizer)
+    interp = parser._interp
+    simulator = parser._interp = ProfilingSimulator(parser, samples)
+    try:
+        for identifier, lines in texts:
+            state = scanLines(lines)
+            simulator.identifier = identifier
+            simulator.content = state.content
+            simulator.lineNos = state.lineNos
+            walk('\n'.join(state.content), sll, tree=tree, tokenizer=tokenizer)
+    finally:
+        parser._interp = interp
+    return decisionRecords(parser, simulator.decisions)
+
+
+def decisionRecords(parser, decisions):
+    records = []
+    for decision, x in decisions.items():
+        records.append({
+            'rule': parser.ruleNames[parser.atn.decisionToState[decision].ruleIndex],
+            'decision': decision,
+            'predictions': x.predictions,
+            'seconds': x.seconds,
+            'sll_look': x.sllLook / x.predictions if x.predictions else 0,
+            'sll_max_look': x.sllMaxLook,
+            'full_context': x.fullContext,
+            'll_look': x.llLook / x.fullContext if x.fullContext else 0,
+            'll_max_look': x.llMaxLook,
+            'll_seconds': x.llSeconds,
+            'ambiguities': x.ambiguities,
+            'context_sensitivities': x.contextSensitivities,
+            'errors': x.errors,
+            'atn_transitions': x.atnTransitions,
+            'samples': x.samples
+        })
+    return sorted(records, key=lambda x: x['seconds'], reverse=True)
+
+
+def ruleTotals(records):
+    rules = {}
+    for x in records:
+        total = rules.setdefault(x['rule'], {'rule': x['rule'], 'decisions': 0, 'predictions': 0, 'seconds': 0.0, 'full_context': 0, 'll_seconds': 0.0, 'ambiguities': 0})
+        total['decisions'] += 1
+        for key in ['predictions', 'seconds', 'full_context', 'll_seconds', 'ambiguities']:
+            total[key] += x[key]
+    return sorted(rules.values(), key=lambda x: x['seconds'], reverse=True)
+
+
+def report(records, top):
+    seconds = sum(x['seconds'] for x in records)
+    print(f'{sum(x["predictions"] for x in records)} predictions in {len(records)} decisions, {seconds:.3f}s, '
+          f'{sum(x["full_context"] for x in records)} with full context ({sum(x["ll_seconds"] for x in records):.3f}s)')
+    print()
+    print(f'{"rule":18}{"decisions":>10}{"predictions":>12}{"time":>9}{"share":>7}{"LL":>8}{"LL time":>9}{"ambig":>7}')
+    for x in ruleTotals(records)[:top]:
+        print(f'{x["rule"]:18}{x["decisions"]:10}{x["predictions"]:12}{x["seconds"]:8.3f}s{100*x["seconds"]/seconds if seconds else 0:6.1f}%'
+              f'{x["full_context"]:8}{x["ll_seconds"]:8.3f}s{x["ambiguities"]:7}')
+    print()
+    print(f'{"rule":18}{"dec":>4}{"predictions":>12}{"time":>9}{"SLL look":>10}{"max":>5}{"LL":>7}{"LL look":>9}{"max":>5}{"LL time":>9}{"ambig":>7}{"ctx":>6}{"ATN":>7}')
+    for x in records[:top]:
+        print(f'{x["rule"]:18}{x["decision"]:4}{x["predictions"]:12}{x["seconds"]:8.3f}s{x["sll_look"]:10.2f}{x["sll_max_look"]:5}'
+              f'{x["full_context"]:7}{x["ll_look"]:9.2f}{x["ll_max_look"]:5}{x["ll_seconds"]:8.3f}s{x["ambiguities"]:7}{x["context_sensitivities"]:6}{x["atn_transitions"]:7}')
+    hot = [x for x in records[:top] if x['samples']]
+    if hot:
+        print()
+        for x in hot:
+            print(f'{x["rule"]} (decision {x["decision"]})')
+            for sample in x['samples']:
+                print(f'  {sample["kind"]:20}{sample["identifier"]}:{sample["line"]}  {sample["input"]!r} in {sample["content"]!r}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the prediction decisions of the parser on a corpus')
+    parser.add_argument('--corpus', help='an ATF file instead of generated texts')
+    parser.add_argument('--texts', type=int, default=200, help='number of generated texts')
+    generate.addArguments(parser)
+    parser.add_argument('--sll', action='store_true')
+    parser.add_argument('--tree-free', action='store_true')
+    parser.add_argument('--tokenizer', choices=['antlr', 'scanner'], default='antlr')
+    parser.add_argument('--dfa', help='saved DFA to start from, see saveDFA, instead of a cold one')
+    parser.add_argument('--top', type=int, default=20, help='number of rules and decisions to show')
+    parser.add_argument('--samples', type=int, default=3, help='samples per decision and kind of event')
+    parser.add_argument('--output', help='JSON file for all decisions')
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            texts = list(readTexts(f))
+    else:
+        texts = list(generate.corpus(args.texts, args.seed, lines=args.lines, words=args.words, mix=args.mix))
+    if args.dfa:
+        loadDFA(args.dfa)
+
+    records = profile(texts, args.sll, not args.tree_free, args.tokenizer, args.samples)
+    report(records, args.top)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rules': ruleTotals(records), 'decisions': records}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
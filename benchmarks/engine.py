@@ -0,0 +1,44 @@
+# Compares parsing with a parse tree walked afterwards to parsing with the listener run as rules complete:
+# identical rows, throughput and peak memory
+#
+#   python -m benchmarks.engine corpus.atf [sll]
+
+import sys
+import time
+import tracemalloc
+
+from writingsumerianparser.parser import readTexts, scanLines, walk, makeTables
+
+
+def rows(listener):
+    return makeTables(listener.signs, listener.compounds, listener.words, listener.sections, listener.errorListener.errors, 'dict')
+
+
+def main(path, sll=False):
+    with open(path) as f:
+        texts = ['\n'.join(scanLines(lines).content) for _, lines in readTexts(f)]
+    # Error recovery depends on the prediction cache, both engines are compared with a warm one
+    for text in texts:
+        walk(text, sll)
+
+    different = 0
+    for text in texts:
+        if rows(walk(text, sll)) != rows(walk(text, sll, tree=False)):
+            different += 1
+    print(f'{len(texts)} texts, {different} with different rows')
+
+    large = '\n'.join(texts)
+    for tree in (True, False):
+        t = time.perf_counter()
+        for text in texts:
+            walk(text, sll, tree=tree)
+        elapsed = time.perf_counter()-t
+        tracemalloc.start()
+        walk(large, sll, tree=tree)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f'{"tree" if tree else "actions":8}{len(texts)/elapsed:8.1f} texts/s  {peak/2**20:8.1f} MiB peak for all texts as one')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], len(sys.argv) > 2 and sys.argv[2] == 'sll')
@@ -0,0 +1,101 @@
+# Time to write the tables of a corpus in each output format of parseFile, their size, and the time
+# to read two columns of the signs table back. With --dictionary the signs table is written as with
+# parseFile(dictionary=True), its sizes including the dictionary tables.
+#
+#   python -m benchmarks.formats [--corpus corpus.atf | --texts N ...] [--row-group-size R] [--dictionary]
+
+import argparse
+import os
+import tempfile
+import time
+
+from writingsumerianparser.columnar import ArrowWriter, SCHEMAS, writeArrowTables
+from writingsumerianparser.dictionary import ENCODED, SignDictionary, encodedSchema
+from writingsumerianparser.parser import parseLines, readTexts, writeFrame
+from writingsumerianparser.pgcopy import PREFIX, TABLES
+
+from . import generate
+from .pgcopy import NAMES, copyTime, writeCSV, writeCopy
+
+
+def writeArrow(directory, results, format, rowGroupSize, schemas=SCHEMAS):
+    writers = [ArrowWriter(os.path.join(directory, x+'.'+format), schemas[x], format, rowGroupSize) for x in NAMES]
+    for identifier, tables in results:
+        writeArrowTables(writers, tables, identifier, 'corpus/')
+    for writer in writers:
+        writer.close()
+
+
+def readSigns(directory, format, schemas=SCHEMAS):
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = [schemas['signs'][2][0], 'type']
+    if format == 'csv':
+        names = ['transliterationIdentifier', 'index'] + [name for name, _ in schemas['signs']]
+        return pd.read_csv(os.path.join(directory, 'signs.csv'), header=None, names=names, usecols=columns, na_values=r'\N', keep_default_na=False)
+    if format == 'parquet':
+        return pq.read_table(os.path.join(directory, 'signs.parquet'), columns=columns).to_pandas()
+    with pa.memory_map(os.path.join(directory, 'signs.arrow')) as source:
+        return pa.ipc.open_file(source).read_all().select(columns).to_pandas()
+
+
+def size(directory, extension, names=NAMES):
+    return sum(os.path.getsize(os.path.join(directory, x+extension)) for x in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the output formats of parseFile')
+    parser.add_argument('--corpus', help='an ATF file instead of generated texts')
+    parser.add_argument('--texts', type=int, default=200, help='number of generated texts')
+    generate.addArguments(parser)
+    parser.add_argument('--row-group-size', type=int, default=65536)
+    parser.add_argument('--dictionary', action='store_true', help='write the signs table with ids into dictionaries')
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            texts = list(readTexts(f))
+    else:
+        texts = list(generate.corpus(args.texts, args.seed, lines=args.lines, words=args.words, mix=args.mix))
+    results = [(identifier, parseLines(lines)) for identifier, lines in texts]
+    types = {x: PREFIX+TABLES[x] for x in NAMES}
+    schemas = SCHEMAS
+    names = NAMES
+    if args.dictionary:
+        dictionary = SignDictionary()
+        results = [(identifier, dictionary.encodeTables(tables)) for identifier, tables in results]
+        types['signs'] = encodedSchema(types['signs'], 'integer')
+        schemas = dict(SCHEMAS, signs=encodedSchema(SCHEMAS['signs'], 'nullable'))
+        names = NAMES + list(ENCODED.values())
+
+    def write(format, extension, f):
+        f()
+        if args.dictionary:
+            for name, frame in dictionary.tables().items():
+                writeFrame(os.path.join(directory, name+extension), frame, SCHEMAS[name], format)
+
+    with tempfile.TemporaryDirectory() as directory:
+        extensions = {'csv': '.csv', 'copy': '.bin', 'parquet': '.parquet', 'arrow': '.arrow'}
+        writers = {
+            'csv': lambda: writeCSV(directory, results),
+            'copy': lambda: writeCopy(directory, results, types),
+            'parquet': lambda: writeArrow(directory, results, 'parquet', args.row_group_size, schemas),
+            'arrow': lambda: writeArrow(directory, results, 'arrow', args.row_group_size, schemas)
+        }
+        print(f'{"":8}{"write":>9}{"bytes":>12}{"read 2 columns":>16}')
+        for format, f in writers.items():
+            t = time.perf_counter()
+            write(format, extensions[format], f)
+            seconds = time.perf_counter() - t - (copyTime(results) if format == 'csv' else 0)
+            if format == 'copy':
+                print(f'{format:8}{seconds:8.3f}s{size(directory, extensions[format], names):12}')
+                continue
+            t = time.perf_counter()
+            readSigns(directory, format, schemas)
+            print(f'{format:8}{seconds:8.3f}s{size(directory, extensions[format], names):12}{time.perf_counter()-t:15.3f}s')
+
+
+if __name__ == '__main__':
+    main()
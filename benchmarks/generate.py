@@ -0,0 +1,143 @@
+# Synthetic transliterations built from the constructs of Cuneiform.g4, for benchmarking
+#
+#   python -m benchmarks.generate texts [--seed S] [--lines A-B] [--words A-B] [--mix feature=p,...] > corpus.atf
+
+import argparse
+import random
+
+
+VALUES = ['a', 'e', 'i', 'u', 'an', 'ba', 'bi2', 'du3', 'e2', 'en', 'ga', 'gu4', 'in', 'ki', 'lugal', 'lil2', 'ma', 'mu',
+          'na', 'ne', 'nu', 'ra', 'ri', 'ru', 'sa2', 'še3', 'ša', 'ta', 'tum', 'um', 'zu', 'ĝa2', 'ḫe2', 'dumu', 'sila3']
+SIGNS = ['AN', 'KI', 'LUGAL', 'E2', 'ŠE3', 'GAL', 'DU3', 'KA', 'GAR', 'UD', 'DIŠ', 'NA', 'MU', 'GIŠ', 'EN', 'DUMU']
+COMPLEX_SIGNS = ['KA×GAR', 'LAGAB×U', '|A.AN|', '|KA×GAR|', 'GIŠ@t', 'AN+AN', 'ŠE3~a']
+DETERMINATIVES = ['d', 'giš', 'ki', 'lu2', 'uruda', 'kuš', 'na4', 'tug2', 'munus']
+NUMBERS = [('1', 'DIŠ'), ('2', 'DIŠ'), ('3', 'AŠ'), ('5', 'U'), ('1', 'GEŠ2'), ('4', 'BARIG'), ('2', 'BAN2'), ('6', 'IKU'), ('1', 'ŠAR2')]
+SHIFTS = ['%a', '%s', '%sux', '%person', '%place', '%god', '%st+', '%st-']
+SURFACES = ['@obverse', '@reverse', '@left', '@right', '@top', '@bottom', '@surface a']
+COMMENTS = ['broken', 'erased', 'over erasure', 'coll.']
+DESCRIPTIONS = ['"erasure"', '"traces"', '"seal impression"']
+
+# Probability of each construct, per word or per line
+DEFAULT_MIX = {
+    'logogram': 0.15,       # sign names instead of values
+    'complex': 0.05,        # sign complexes like KA×GAR or |A.AN|
+    'determinative': 0.15,
+    'complement': 0.05,     # phonetic complements <…>
+    'signSpec': 0.05,       # values qualified by their sign, du3(DU3)
+    'number': 0.1,
+    'break': 0.05,          # […] and x
+    'lost': 0.08,           # words in [ ]
+    'damaged': 0.06,        # words in ⸢ ⸣ or with #
+    'uncertain': 0.05,      # ? and !
+    'description': 0.01,
+    'shift': 0.03,
+    'compoundComment': 0.02,
+    'lineComment': 0.03,
+    'surface': 0.04,        # per line, a new surface
+    'column': 0.02          # per line, a new column
+}
+
+
+def value(rng, mix):
+    if rng.random() < mix['logogram']:
+        if rng.random() < mix['complex']:
+            return rng.choice(COMPLEX_SIGNS)
+        return '.'.join(rng.choice(SIGNS) for _ in range(rng.randint(1, 2)))
+    v = rng.choice(VALUES)
+    if rng.random() < mix['signSpec']:
+        v += '(' + rng.choice(SIGNS) + ')'
+    if rng.random() < mix['uncertain']:
+        v += rng.choice('?!')
+    return v
+
+
+def word(rng, mix):
+    r = rng.random()
+    if r < mix['break']:
+        return rng.choice(['[…]', 'x', '[x]'])
+    if r < mix['break'] + mix['number']:
+        n, sign = rng.choice(NUMBERS)
+        w = f'{n}({sign})'
+    elif r < mix['break'] + mix['number'] + mix['description']:
+        return rng.choice(DESCRIPTIONS)
+    else:
+        w = '-'.join(value(rng, mix) for _ in range(rng.randint(1, 4)))
+        if rng.random() < mix['determinative']:
+            w = '{' + rng.choice(DETERMINATIVES) + '}' + w
+        if rng.random() < mix['complement']:
+            w += '<' + rng.choice(VALUES) + '>'
+    r = rng.random()
+    if r < mix['lost']:
+        w = '[' + w + ']'
+    elif r < mix['lost'] + mix['damaged']:
+        w = '⸢' + w + '⸣' if rng.random() < 0.5 else w + '#'
+    return w
+
+
+def line(rng, mix, words):
+    parts = []
+    for _ in range(rng.randint(*words)):
+        if rng.random() < mix['shift']:
+            parts.append(rng.choice(SHIFTS))
+        parts.append(word(rng, mix))
+        if rng.random() < mix['compoundComment']:
+            parts[-1] += ' (' + rng.choice(COMMENTS) + ')'
+    content = ' '.join(parts)
+    if rng.random() < mix['lineComment']:
+        content += ' # ' + rng.choice(COMMENTS)
+    return content
+
+
+def text(rng, lines=(5, 40), words=(2, 8), mix=DEFAULT_MIX):
+    result = []
+    no = 1
+    column = 1
+    for _ in range(rng.randint(*lines)):
+        if rng.random() < mix['surface']:
+            result.append(rng.choice(SURFACES))
+            no = 1
+        if rng.random() < mix['column']:
+            result.append(f'@column {column}')
+            column += 1
+        result.append(f'{no}.\t' + line(rng, mix, words))
+        no += 1
+    return result
+
+
+def corpus(texts, seed=0, **kwargs):
+    # Texts as read by readTexts: an identifier and its lines
+    rng = random.Random(seed)
+    for i in range(texts):
+        yield f'X{i:06d}', [x+'\n' for x in text(rng, **kwargs)]
+
+
+def parseRange(s):
+    a, _, b = s.partition('-')
+    return int(a), int(b or a)
+
+
+def parseMix(s):
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (s or '').split(',')):
+        name, p = item.split('=')
+        if name not in mix:
+            raise ValueError(f'Unknown feature: {name}')
+        mix[name] = float(p)
+    return mix
+
+
+def addArguments(parser):
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lines', type=parseRange, default=(5, 40), help='lines per text, e.g. 5-40')
+    parser.add_argument('--words', type=parseRange, default=(2, 8), help='words per line, e.g. 2-8')
+    parser.add_argument('--mix', type=parseMix, default=DEFAULT_MIX, help='feature probabilities, e.g. number=0.3,lost=0')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic transliterations')
+    parser.add_argument('texts', type=int)
+    addArguments(parser)
+    args = parser.parse_args()
+    for identifier, lines in corpus(args.texts, args.seed, lines=args.lines, words=args.words, mix=args.mix):
+        print(f'@text {identifier}')
+        print(''.join(lines), end='')
@@ -0,0 +1,95 @@
+# Writes the tables of a corpus as CSV and as PostgreSQL binary COPY, and checks that both hold the same rows
+#
+#   python -m benchmarks.pgcopy [--corpus corpus.atf | --texts N ...] [--repeat R]
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from writingsumerianparser.parser import parseLines, readTexts, writeTables
+from writingsumerianparser.pgcopy import CopyWriter, PREFIX, TABLES, readCopyFile, writeCopyTables
+
+from . import generate
+
+
+NAMES = ['surfaces', 'blocks', 'lines', 'signs', 'compounds', 'words', 'sections', 'errors']
+
+
+def writeCSV(directory, results):
+    files = [open(os.path.join(directory, x+'.csv'), 'w') for x in NAMES]
+    for identifier, tables in results:
+        # writeTables adds the prefix columns to the frames it is given
+        writeTables(files, [x.copy() for x in tables], identifier, 'corpus/')
+    for f in files:
+        f.close()
+
+
+def writeCopy(directory, results, types=None):
+    types = types or {x: PREFIX+TABLES[x] for x in NAMES}
+    writers = [CopyWriter(open(os.path.join(directory, x+'.bin'), 'wb'), types[x]) for x in NAMES]
+    for identifier, tables in results:
+        writeCopyTables(writers, tables, identifier, 'corpus/')
+    for writer in writers:
+        writer.close()
+
+
+def copyTime(results):
+    # Copying the frames is part of the CSV time, subtracted to compare the writers alone
+    t = time.perf_counter()
+    for _, tables in results:
+        [x.copy() for x in tables]
+    return time.perf_counter() - t
+
+
+def best(f, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+def asText(value):
+    return r'\N' if value is None else str(value)
+
+
+def check(directory):
+    # The binary rows, formatted like pandas formats them, have to match the CSV rows
+    for name in NAMES:
+        with open(os.path.join(directory, name+'.csv'), newline='') as f:
+            expected = [[r'\N' if x == r'\N' else x for x in row] for row in csv.reader(f)]
+        rows = [[asText(x) for x in row] for row in readCopyFile(os.path.join(directory, name+'.bin'), name)]
+        if rows != expected:
+            mismatch = next((i for i, (a, b) in enumerate(zip(rows, expected)) if a != b), min(len(rows), len(expected)))
+            raise AssertionError(f'{name}: row {mismatch} differs')
+        print(f'{name:10}{len(rows):8} rows {os.path.getsize(os.path.join(directory, name+".csv")):10} bytes CSV {os.path.getsize(os.path.join(directory, name+".bin")):10} bytes binary')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the CSV and binary COPY writers')
+    parser.add_argument('--corpus', help='an ATF file instead of generated texts')
+    parser.add_argument('--texts', type=int, default=200, help='number of generated texts')
+    generate.addArguments(parser)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            texts = list(readTexts(f))
+    else:
+        texts = list(generate.corpus(args.texts, args.seed, lines=args.lines, words=args.words, mix=args.mix))
+    results = [(identifier, parseLines(lines)) for identifier, lines in texts]
+
+    with tempfile.TemporaryDirectory() as directory:
+        a = best(lambda: writeCSV(directory, results), args.repeat) - copyTime(results)
+        b = best(lambda: writeCopy(directory, results), args.repeat)
+        check(directory)
+    print(f'CSV     {a:8.3f}s')
+    print(f'binary  {b:8.3f}s {a/b:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# Times each stage of the pipeline separately and saves the results as JSON, to compare versions
+#
+#   python -m benchmarks.stages [--corpus corpus.atf | --texts N --lines A-B --words A-B --mix ...] [--sll] [--tokenizer scanner] [--output results.json]
+#   python -m benchmarks.stages --compare old.json new.json
+
+import argparse
+import importlib.metadata
+import io
+import json
+import platform
+import time
+
+from writingsumerianparser.cache import sourceVersion
+from writingsumerianparser.metrics import Profile
+from writingsumerianparser.parser import readTexts, scanLines, walk, writeTables
+
+from . import generate
+
+
+STAGES = ['scan', 'lex', 'parse', 'walk', 'merge', 'frames', 'csv']
+
+
+def measure(identifier, lines, times, files, sll=False, tokenizer='antlr'):
+    # Follows parseFile for one text, adding the time of each stage to times
+    t = time.perf_counter()
+    state = scanLines(lines)
+    t = lap(times, 'scan', t)
+
+    # Lexing, parsing and the listener's walk as timed by walk itself, with its fallback from SLL to LL
+    profile = Profile(identifier)
+    listener = walk('\n'.join(state.content), sll, profile=profile, tokenizer=tokenizer)
+    for stage in ['lex', 'parse', 'walk']:
+        times[stage] += profile.seconds.get(stage, 0)
+    t = time.perf_counter()
+
+    state.combine(listener.signs, listener.compounds, listener.words, listener.sections, listener.errorListener.errors)
+    t = lap(times, 'merge', t)
+
+    tables = state.tables('pandas')
+    t = lap(times, 'frames', t)
+
+    for f in files:
+        f.seek(0)
+        f.truncate()
+    writeTables(files, tables, identifier, 'corpus/')
+    lap(times, 'csv', t)
+    return len(state.content), len(listener.signs)
+
+
+def lap(times, stage, t):
+    now = time.perf_counter()
+    times[stage] += now-t
+    return now
+
+
+def run(texts, sll=False, repeat=3, tokenizer='antlr'):
+    # Each stage's best total over the repeats
+    files = [io.StringIO() for _ in range(8)]
+    best = dict.fromkeys(STAGES, float('inf'))
+    for _ in range(repeat):
+        times = dict.fromkeys(STAGES, 0.0)
+        lines = signs = 0
+        for identifier, content in texts:
+            n, m = measure(identifier, content, times, files, sll, tokenizer)
+            lines += n
+            signs += m
+        best = {x: min(best[x], times[x]) for x in STAGES}
+    return {
+        'texts': len(texts),
+        'lines': lines,
+        'signs': signs,
+        'stages': {x: {'seconds': best[x], 'us_per_line': 1e6*best[x]/max(lines, 1)} for x in STAGES},
+        'total': sum(best.values())
+    }
+
+
+def version(package):
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def report(result):
+    print(f'{result["texts"]} texts, {result["lines"]} lines, {result["signs"]} signs')
+    for stage, x in result['stages'].items():
+        print(f'{stage:8}{x["seconds"]:9.3f}s {x["us_per_line"]:9.1f}µs/line {100*x["seconds"]/result["total"]:5.1f}%')
+    print(f'{"total":8}{result["total"]:9.3f}s')
+
+
+def compare(old, new):
+    if old['config'] != new['config']:
+        print('Warning: results for different configurations')
+    print(f'{"":8}{"old":>10}{"new":>10}{"ratio":>8}')
+    for stage in STAGES + ['total']:
+        a = old['total'] if stage == 'total' else old['stages'][stage]['seconds']
+        b = new['total'] if stage == 'total' else new['stages'][stage]['seconds']
+        print(f'{stage:8}{a:9.3f}s{b:9.3f}s{b/a if a else float("nan"):8.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time each stage of parsing a corpus')
+    parser.add_argument('--corpus', help='an ATF file instead of generated texts')
+    parser.add_argument('--texts', type=int, default=200, help='number of generated texts')
+    generate.addArguments(parser)
+    parser.add_argument('--sll', action='store_true')
+    parser.add_argument('--tokenizer', choices=['antlr', 'scanner'], default='antlr')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='JSON file for the results')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two saved results')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            compare(json.load(f), json.load(g))
+        return
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            texts = list(readTexts(f))
+        config = {'corpus': args.corpus}
+    else:
+        texts = list(generate.corpus(args.texts, args.seed, lines=args.lines, words=args.words, mix=args.mix))
+        config = {'texts': args.texts, 'seed': args.seed, 'lines': args.lines, 'words': args.words, 'mix': args.mix}
+    config.update(sll=args.sll, repeat=args.repeat, tokenizer=args.tokenizer)
+
+    result = run(texts, args.sll, args.repeat, args.tokenizer)
+    result.update({
+        'config': config,
+        'source': sourceVersion(),
+        'versions': {x: version(x) for x in ['writingsumerianparser', 'antlr4-python3-runtime', 'pandas']},
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S')
+    })
+    report(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
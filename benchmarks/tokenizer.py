@@ -0,0 +1,95 @@
+# Compares the tokens of the scanner with those of the generated lexer, on a corpus and on random
+# strings of the characters the grammar uses, and times both
+#
+#   python -m benchmarks.tokenizer [--corpus corpus.atf | --texts N ...] [--random N] [--length L]
+
+import argparse
+import random
+import time
+
+import antlr4
+
+from writingsumerianparser.grammar.CuneiformLexer import CuneiformLexer
+from writingsumerianparser.parser import readTexts, scanLines
+from writingsumerianparser.scanner import CuneiformScanner
+
+from . import generate
+
+
+# Every character named in the lexer rules, a few outside them, and the brackets and separators
+ALPHABET = ('aeiubdgĝhḫjklmnpqrřsšṣtṭwyz’AEIUBDGĜHḪJKLMNPQRŘSŠṢTṬWYZ0123456789½⅓⅔¼¾⅕⅖⅗⅘⅙⅚⅐⅛⅜⅝⅞⅑⅒⁺⁻'
+            'xXnNcf' + '[]⸢⸣‹›«»{}<>()' + ' \n\t-.,+×/%@&;:_|=–$…~*#?!"' + 'oøαé')
+
+
+def tokens(cls, text):
+    lexer = cls(antlr4.InputStream(text))
+    result = []
+    while True:
+        token = lexer.nextToken()
+        result.append((token.type, token.text, token.start, token.stop, token.line, token.column))
+        if token.type == antlr4.Token.EOF:
+            return result
+
+
+def compare(texts):
+    for text in texts:
+        expected = tokens(CuneiformLexer, text)
+        actual = tokens(CuneiformScanner, text)
+        if actual != expected:
+            i = next((i for i, (a, b) in enumerate(zip(actual, expected)) if a != b), min(len(actual), len(expected)))
+            return text, expected[i:i+3], actual[i:i+3]
+    return None
+
+
+def randomTexts(n, length, seed):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, length)))
+
+
+def lexTime(cls, texts):
+    t = time.perf_counter()
+    for text in texts:
+        lexer = cls(antlr4.InputStream(text))
+        while lexer.nextToken().type != antlr4.Token.EOF:
+            pass
+    return time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the scanner against the generated lexer')
+    parser.add_argument('--corpus', help='an ATF file instead of generated texts')
+    parser.add_argument('--texts', type=int, default=200, help='number of generated texts')
+    generate.addArguments(parser)
+    parser.add_argument('--random', type=int, default=20000, help='number of random strings')
+    parser.add_argument('--length', type=int, default=40, help='maximum length of the random strings')
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            texts = list(readTexts(f))
+    else:
+        texts = list(generate.corpus(args.texts, args.seed, lines=args.lines, words=args.words, mix=args.mix))
+    # What the parser is given: the content of the code lines
+    texts = ['\n'.join(scanLines(lines).content) for _, lines in texts]
+
+    failed = False
+    for name, sample in [('corpus', texts), ('random', list(randomTexts(args.random, args.length, args.seed)))]:
+        mismatch = compare(sample)
+        if mismatch is None:
+            print(f'{name:8}{len(sample):8} texts, identical tokens')
+        else:
+            failed = True
+            text, expected, actual = mismatch
+            print(f'{name:8} mismatch in {text!r}\n  lexer   {expected}\n  scanner {actual}')
+
+    a = lexTime(CuneiformLexer, texts)
+    b = lexTime(CuneiformScanner, texts)
+    print(f'lexer   {a:8.3f}s')
+    print(f'scanner {b:8.3f}s {a/b:6.1f}x')
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+# Time spent in each stage of parsing a corpus, to see the share of the listener walk
+#
+#   python -m benchmarks.walk corpus.atf [repeat]
+
+import sys
+
+from writingsumerianparser.parser import readTexts
+
+from .stages import run, report
+
+
+def main(path, repeat=1):
+    with open(path) as f:
+        texts = list(readTexts(f))
+    result = run(texts, repeat=repeat)
+    report(result)
+    print(f'walk    {1e6*result["stages"]["walk"]["seconds"]/result["signs"]:9.1f}µs per sign')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1)
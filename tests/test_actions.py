@@ -0,0 +1,19 @@
+import pytest
+
+from benchmarks import generate
+from writingsumerianparser import parseText
+
+
+ERRORS = ['1.\tlugal-e ]\n2.\t[ki', '1.\t_a\n2.\tb_', '1.\tlugal-%pa|ce an\n2.\t(a-na', '@obverse\n1.\t%sec=A {d}en-lil2 |KA×GAR| 3(AŠ@t) ki-\n2.\tta"\n$ blank\n3.\t<x> ⸢ki⸣#']
+TEXTS = ERRORS + [''.join(x) for _, x in generate.corpus(10, 8)]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_actions_equal_tree_walk(text):
+    tree = parseText(text)
+    actions = parseText(text, tree=False)
+    assert all(a.equals(b) for a, b in zip(tree, actions))
+
+
+def test_texts_have_errors():
+    assert all(len(parseText(x)[-1]) for x in ERRORS)
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+import pandas as pd
+
+from writingsumerianparser import parseText
+
+
+TEXT = '1.\tlugal-e ]\n2.\t{d}en-lil2'
+
+
+def test_dict_backend_equals_pandas():
+    frames = parseText(TEXT)
+    dicts = parseText(TEXT, backend='dict')
+    for frame, table in zip(frames, dicts):
+        assert list(frame.columns) == list(table)
+        for name in table:
+            assert [None if pd.isna(x) else x for x in frame[name].astype(object).tolist()] == table[name]
+
+
+def test_without_pandas():
+    # The dict backend, validation and the server do not import pandas
+    code = ('import sys; sys.modules["pandas"] = sys.modules["numpy"] = None\n'
+            'from writingsumerianparser import parseText, validateText\n'
+            'from writingsumerianparser import server\n'
+            'assert parseText("1.\\tlugal-e", backend="dict")[3]["value"] == ["lugal", "e"]\n'
+            'assert len(validateText("1.\\tlugal-e ]")) == 1\n')
+    subprocess.run([sys.executable, '-c', code], check=True)
@@ -0,0 +1,41 @@
+from writingsumerianparser import parseText
+
+
+def budgetErrors(tables):
+    return [msg for msg in tables[7]['msg'] if msg.startswith('Parse budget exceeded')]
+
+
+def test_within_budget_is_unchanged():
+    text = '1.\tlugal-e\n2.\tki'
+    full = parseText(text)
+    limited = parseText(text, lineLimit=10, tokenLimit=1000, timeLimit=60)
+    assert all(a.equals(b) for a, b in zip(full, limited))
+
+
+def test_first_line_over_budget():
+    tables = parseText('1.\t' + 'lugal '*40 + '\n2.\tki\n3.\tki', tokenLimit=20)
+    assert tables[3]['value'].tolist() == ['ki', 'ki']
+    assert tables[3]['line_no_code'].tolist() == [1, 2]
+    assert budgetErrors(tables)[1].endswith('lines 1-1 left out')
+
+
+def test_only_the_line_over_budget_is_left_out():
+    tables = parseText('1.\ta\n2.\tki\n3.\tki\n4.\t' + 'lugal '*40 + '\n5.\tki', tokenLimit=20)
+    assert tables[3]['value'].tolist() == ['a', 'ki', 'ki', 'ki']
+    assert tables[3]['line_no_code'].tolist() == [0, 1, 2, 4]
+    errors = budgetErrors(tables)
+    assert len(errors) == 2 and errors[1].endswith('lines 4-4 left out')
+
+
+def test_units_equal_the_whole_text():
+    text = '1.\t%sec=A lugal-e\n2.\t{d}en-lil2 [x]\n3.\t%a a-na\n4.\tki-ta'
+    full = parseText(text)
+    units = parseText(text, lineLimit=1)
+    assert all(a.equals(b) for a, b in zip(full[:7], units[:7]))
+    assert budgetErrors(units) == ['Parse budget exceeded: 4 lines, parsed line by line']
+
+
+def test_fail_fallback():
+    tables = parseText('1.\tlugal-e\n2.\tki', lineLimit=1, fallback='fail')
+    assert len(tables[3]) == 0
+    assert budgetErrors(tables) == ['Parse budget exceeded: 2 lines']
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from writingsumerianparser import ParseCache, TextIndex, parseFile
+
+
+TEXTS = {'P1': '1.\tlugal-e\n', 'P2': '1.\tki\n2.\t{d}en-lil2\n', 'P3': '1.\t[x] an\n'}
+
+
+def writeCorpus(path, texts):
+    with open(path, 'w') as f:
+        for identifier, text in texts.items():
+            f.write(f'@text {identifier}\n{text}')
+
+
+def identifiers(target):
+    with open(os.path.join(target, 'transliterations.csv')) as f:
+        return [line.split(',')[0] for line in f]
+
+
+def test_cached_tables_equal_parsed_ones(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, TEXTS)
+    cache = ParseCache(str(tmp_path / 'cache'))
+    for target in ['a', 'b']:
+        os.makedirs(tmp_path / target)
+        parseFile(corpus, str(tmp_path / target), 'c/', cache=cache)
+    for name in os.listdir(tmp_path / 'a'):
+        assert (tmp_path / 'a' / name).read_bytes() == (tmp_path / 'b' / name).read_bytes()
+
+
+def test_delta_writes_changed_texts(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, TEXTS)
+    cache = ParseCache(str(tmp_path / 'cache'))
+    for target in ['first', 'second', 'third']:
+        os.makedirs(tmp_path / target)
+    parseFile(corpus, str(tmp_path / 'first'), 'c/', cache=cache, delta=True)
+    assert identifiers(tmp_path / 'first') == ['P1', 'P2', 'P3']
+    parseFile(corpus, str(tmp_path / 'second'), 'c/', cache=cache, delta=True)
+    assert identifiers(tmp_path / 'second') == []
+    writeCorpus(corpus, {**TEXTS, 'P2': '1.\tki-ta\n'})
+    parseFile(corpus, str(tmp_path / 'third'), 'c/', cache=cache, delta=True)
+    assert identifiers(tmp_path / 'third') == ['P2']
+
+
+def test_delta_needs_a_cache(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, TEXTS)
+    with pytest.raises(ValueError):
+        parseFile(corpus, str(tmp_path), 'c/', delta=True)
+
+
+def test_delta_of_selected_texts(tmp_path, capsys):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, TEXTS)
+    cache = ParseCache(str(tmp_path / 'cache'))
+    for target in ['first', 'second', 'third']:
+        os.makedirs(tmp_path / target)
+    parseFile(corpus, str(tmp_path / 'first'), 'c/', cache=cache, delta=True)
+    writeCorpus(corpus, {**TEXTS, 'P1': '1.\tlugal\n', 'P2': '1.\tki-ta\n'})
+    parseFile(corpus, str(tmp_path / 'second'), 'c/', cache=cache, delta=True, identifiers=['P2'])
+    assert identifiers(tmp_path / 'second') == ['P2']
+    assert 'Removed' not in capsys.readouterr().out
+    # The texts left out of the selection keep their entries, only the changed one is written again
+    parseFile(corpus, str(tmp_path / 'third'), 'c/', cache=cache, delta=True)
+    assert identifiers(tmp_path / 'third') == ['P1']
+
+
+def test_delta_of_an_index_needs_identifiers(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, TEXTS)
+    with pytest.raises(ValueError):
+        parseFile(corpus, str(tmp_path), 'c/', cache=ParseCache(str(tmp_path / 'cache')), delta=True, index=TextIndex.open(corpus))
+
+
+def test_delta_lists_removed_texts(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, TEXTS)
+    cache = ParseCache(str(tmp_path / 'cache'))
+    for target in ['first', 'second']:
+        os.makedirs(tmp_path / target)
+    parseFile(corpus, str(tmp_path / 'first'), 'c/', cache=cache, delta=True)
+    assert (tmp_path / 'first' / 'removed.csv').read_text() == ''
+    writeCorpus(corpus, {'P2': TEXTS['P2']})
+    parseFile(corpus, str(tmp_path / 'second'), 'c/', cache=cache, delta=True)
+    assert identifiers(tmp_path / 'second') == []
+    assert (tmp_path / 'second' / 'removed.csv').read_text().split() == ['P1,c/P1,c/', 'P3,c/P3,c/']
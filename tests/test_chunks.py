@@ -0,0 +1,36 @@
+from benchmarks import generate
+from writingsumerianparser import parseText
+
+
+def test_chunks_equal_sequential_parse():
+    lines = [line for _, text in generate.corpus(4, 5, lines=(30, 30)) for line in text]
+    text = ''.join(lines)
+    sequential = parseText(text)
+    chunked = parseText(text, chunkProcesses=2, chunkLines=20)
+    assert all(a.equals(b) for a, b in zip(sequential, chunked))
+
+
+def test_shifts_carry_over_chunks():
+    text = '\n'.join(['1.\t%a %person lugal-e', '2.\t%sec=A ki'] + [f'{i}.\tan-na' for i in range(3, 30)])
+    sequential = parseText(text)
+    chunked = parseText(text, chunkProcesses=2, chunkLines=10)
+    assert all(a.equals(b) for a, b in zip(sequential, chunked))
+
+
+def test_unknown_shift_dropped_by_recovery():
+    # The pre-scan of the chunks' entry states skips a shift the parse drops
+    for first in ['lugal-%pa|ce', 'a-%pa|ce-e', '<%pa|ce>']:
+        text = '\n'.join([f'1.\t{first}'] + [f'{i}.\tan-na' for i in range(2, 15)])
+        sequential = parseText(text)
+        chunked = parseText(text, chunkProcesses=2, chunkLines=5)
+        assert all(a.equals(b) for a, b in zip(sequential, chunked))
+
+
+def test_errors_keep_sequential_order():
+    # Parser errors of all chunks first, then those of the listener, as in one parse
+    for lines in [['1.\t_a', '2.\tb_'], ['1.\tlugal ]', '2.\ta-na ki-', '3.\t_a']]:
+        text = '\n'.join([f'{i}.\tan-na' for i in range(1, 12)] + lines * 4 + [f'{i}.\tki' for i in range(20, 30)])
+        sequential = parseText(text)
+        chunked = parseText(text, chunkProcesses=2, chunkLines=8)
+        assert len(sequential[-1]) > 1
+        assert all(a.equals(b) for a, b in zip(sequential, chunked))
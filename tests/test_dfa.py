@@ -0,0 +1,31 @@
+import os
+import pickle
+import subprocess
+import sys
+
+from benchmarks import generate
+from writingsumerianparser import loadDFA, saveDFA
+from writingsumerianparser.parser import parseLines
+
+
+def test_saved_dfa_gives_the_same_tables(tmp_path):
+    # Saved after warming up here, loaded into a new process, which parses the same texts
+    texts = list(generate.corpus(20, 4))
+    for _, lines in texts:
+        parseLines(lines)
+    path = str(tmp_path / 'dfa.pickle')
+    saveDFA(path)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ('import pickle, sys\n'
+            'from benchmarks import generate\n'
+            'from writingsumerianparser import loadDFA\n'
+            'from writingsumerianparser.parser import parseLines\n'
+            f'assert loadDFA({path!r})\n'
+            'tables = [parseLines(lines, backend="dict") for _, lines in generate.corpus(20, 4)]\n'
+            'sys.stdout.buffer.write(pickle.dumps(tables))\n')
+    result = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, cwd=root)
+    assert pickle.loads(result.stdout) == [parseLines(lines, backend='dict') for _, lines in texts]
+
+
+def test_missing_dfa(tmp_path):
+    assert loadDFA(str(tmp_path / 'missing.pickle')) is False
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from writingsumerianparser import parseFile
+from writingsumerianparser.parser import TABLE_NAMES, parseLines, readTexts
+from writingsumerianparser.dictionary import ENCODED
+from writingsumerianparser.pgcopy import TABLES, frameColumns, readCopyFile
+
+
+TEXTS = {
+    'P1': '@obverse\n1.\t%sec=A lugal-e [x] # a comment\n2.\t{d}en-lil2 2(DIŠ) (broken)\n',
+    'P2': '1.\tlugal-e ]\nno tab\n',
+    'P3': '@reverse\n@column 1\n1.\t%a a-na ⸢ki⸣-ta\n'
+}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = str(tmp_path / 'corpus.atf')
+    with open(path, 'w') as f:
+        for identifier, text in TEXTS.items():
+            f.write(f'@text {identifier}\n{text}')
+    return path
+
+
+def expectedRows(corpus, table):
+    # The rows parseFile writes, from the tables of parseLines
+    i = TABLE_NAMES.index(table)
+    rows = []
+    with open(corpus) as f:
+        for identifier, lines in readTexts(f):
+            frame = parseLines(lines)[i]
+            rows.extend(zip(['c/'+identifier]*len(frame), frame.index.tolist(), *frameColumns(frame)))
+    return rows
+
+
+def test_copy_round_trip(corpus, tmp_path):
+    parseFile(corpus, str(tmp_path), 'c/', format='copy')
+    for table in TABLE_NAMES:
+        assert list(readCopyFile(str(tmp_path / f'{table}.bin'), table)) == expectedRows(corpus, table), table
+    assert list(readCopyFile(str(tmp_path / 'transliterations.bin'), 'transliterations')) == [(x, 'c/'+x, 'c/') for x in TEXTS]
+
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_arrow_round_trip(corpus, tmp_path, format):
+    pytest.importorskip('pyarrow')
+    from writingsumerianparser.columnar import readArrow
+
+    parseFile(corpus, str(tmp_path), 'c/', format=format, rowGroupSize=4)
+    for table in TABLE_NAMES:
+        frame = readArrow(str(tmp_path / f'{table}.{format}'), format).to_pandas()
+        assert list(zip(*frameColumns(frame))) == expectedRows(corpus, table), table
+
+
+def test_copy_dictionary_round_trip(corpus, tmp_path):
+    import pandas as pd
+    from writingsumerianparser import SignDictionary
+
+    parseFile(corpus, str(tmp_path), 'c/', format='copy', dictionary=True)
+    tables = {table: pd.DataFrame(readCopyFile(str(tmp_path / f'{table}.bin'), table), columns=['id', name]) for name, table in ENCODED.items()}
+    columns = ['transliterationIdentifier', 'index'] + [name+'_id' if name in ENCODED else name for name, _ in TABLES['signs']]
+    signs = pd.DataFrame(readCopyFile(str(tmp_path / 'signs.bin'), 'signs', dictionary=True), columns=columns)
+    decoded = SignDictionary.fromTables(tables).decode(signs)
+    assert list(zip(*frameColumns(decoded))) == expectedRows(corpus, 'signs')
@@ -0,0 +1,24 @@
+from writingsumerianparser import Metrics
+from writingsumerianparser.parser import parseTexts
+
+
+# One error of the scan, one of the parse
+TEXT = ['1.\tlugal-e ]\n', 'no tab\n']
+
+
+def test_errors_count_all_rows_of_the_error_table():
+    metrics = Metrics()
+    (_, tables), = parseTexts([('P1', TEXT)], metrics=metrics)
+    assert len(tables[7]) == 2
+    assert metrics.records[0]['errors'] == 2
+    assert metrics.summary()['errors'] == 2
+
+
+def test_prediction_stages_are_counted_in_workers():
+    # The SLL stage bails out on the syntax error of the second text, which is parsed again with LL
+    texts = [('P1', ['1.\tlugal-e\n']), ('P2', ['1.\tlugal-e ]\n'])]
+    for processes in [1, 2]:
+        metrics = Metrics()
+        list(parseTexts(texts, processes=processes, metrics=metrics, sll=True))
+        assert [(x.get('sll', 0), x.get('ll', 0)) for x in metrics.records] == [(1, 0), (0, 1)]
+        assert (metrics.summary()['sll'], metrics.summary()['ll']) == (1, 1)
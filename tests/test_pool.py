@@ -0,0 +1,27 @@
+import filecmp
+import os
+
+import pytest
+
+from benchmarks import generate
+from writingsumerianparser import parseFile
+
+
+def writeCorpus(path, texts, seed=0):
+    with open(path, 'w') as f:
+        for identifier, content in generate.corpus(texts, seed, lines=(1, 15)):
+            f.write(f'@text {identifier}\n' + ''.join(content))
+        f.write('@text E1\n1.\tlugal ]\n2.\t_a\n')
+
+
+@pytest.mark.parametrize('format, chunksize', [('csv', 1), ('csv', 3), ('copy', 2)])
+def test_pool_writes_the_files_of_one_process(tmp_path, format, chunksize):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, 8)
+    for target, processes in [('single', 1), ('pool', 2)]:
+        os.makedirs(tmp_path / target)
+        parseFile(corpus, str(tmp_path / target), 'c/', processes=processes, chunksize=chunksize, format=format)
+    names = os.listdir(tmp_path / 'single')
+    assert sorted(names) == sorted(os.listdir(tmp_path / 'pool'))
+    for name in names:
+        assert filecmp.cmp(tmp_path / 'single' / name, tmp_path / 'pool' / name, shallow=False), name
@@ -0,0 +1,56 @@
+import re
+
+import pytest
+
+from benchmarks import generate
+from writingsumerianparser import preprocess, preprocessTexts
+
+
+def reference(text, f):
+    # preprocess as it was before, concatenating the result part by part
+    parts = re.split(r'([\(\)]|"[^"]*"|_[^_]*_)', text)
+    res = ''
+    level = 0
+    for i, part in enumerate(parts):
+        if part:
+            if i%2:
+                res += part
+                if part == '(':
+                    level += 1
+                elif part == ')':
+                    level -= 1
+            else:
+                res += f(part) if not level else part
+    return res
+
+
+def upper(segment):
+    return segment.upper()
+
+
+TEXTS = ['lugal (ki) "an" _e2_ x', 'a (b (c) d) e) f (g', 'a "b (c" d) _e (f_ g', '_a "b_ c" d', '', '()""__'] + [''.join(x) for _, x in generate.corpus(20, 4)]
+
+
+def test_preprocess_equals_reference():
+    for text in TEXTS:
+        assert preprocess(text, upper) == reference(text, upper)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_texts_equal_reference(processes):
+    stats = {}
+    results = list(preprocessTexts(iter(TEXTS * 3), upper, maxsize=8, processes=processes, chunksize=2, stats=stats))
+    assert results == [reference(x, upper) for x in TEXTS * 3]
+    # Each segment the callback is applied to is a hit or a miss of the cache
+    calls = []
+    for text in TEXTS * 3:
+        reference(text, lambda x: calls.append(x) or x)
+    assert stats['hits'] + stats['misses'] == len(calls)
+    assert stats['misses'] >= len(set(calls))
+
+
+def test_stopping_early_releases_the_pool():
+    texts = (f'a-{i} (b)' for i in range(100000))
+    results = preprocessTexts(texts, upper, processes=2, chunksize=4)
+    assert [next(results) for _ in range(3)] == ['A-0 (b)', 'A-1 (b)', 'A-2 (b)']
+    results.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from writingsumerianparser import parseText
+from writingsumerianparser.parser import TABLE_NAMES
+
+
+TEXT = '@obverse\n1.\t%sec=A lugal-e [x] (a comment)\n2.\t{d}en-lil2 ]\n3.\t%person a-na'
+
+
+@pytest.mark.parametrize('backend', ['pandas', 'dict'])
+@pytest.mark.parametrize('columns', [
+    {'signs': ['value', 'type', 'line_no_code'], 'errors': None},
+    ['errors'],
+    ['surfaces', 'lines'],
+    {'words': None, 'compounds': ['pn_type', 'section_no'], 'sections': None},
+    {'signs': ['word_no', 'comment', 'stop_col_code']}
+])
+def test_projection_selects_from_full_tables(backend, columns):
+    full = parseText(TEXT, backend=backend)
+    projected = parseText(TEXT, backend=backend, columns=columns)
+    wanted = columns if isinstance(columns, dict) else dict.fromkeys(columns)
+    for name, table, result in zip(TABLE_NAMES, full, projected):
+        if name not in wanted:
+            assert result is None
+            continue
+        names = [x for x in table if wanted[name] is None or x in wanted[name]]
+        if backend == 'dict':
+            assert result == {x: table[x] for x in names}
+        else:
+            assert table[names].equals(result)
+
+
+def test_unknown_columns():
+    with pytest.raises(ValueError):
+        parseText(TEXT, columns=['glyphs'])
+    with pytest.raises(ValueError):
+        parseText(TEXT, columns={'signs': ['glyph']})
@@ -0,0 +1,22 @@
+import antlr4
+import pytest
+
+from benchmarks import generate
+from writingsumerianparser.grammar.CuneiformLexer import CuneiformLexer
+from writingsumerianparser.scanner import CuneiformScanner
+
+
+TEXTS = ['1.\tlugal-e ]\n2.\t[ki', '{d}en-lil2 |KA×GAR| 3(AŠ@t) ⸢ki⸣# "erasure" %sec=A', '\x00 $ ¶'] + [''.join(x) for _, x in generate.corpus(10, 6)]
+
+
+def tokens(lexer):
+    return [(x.type, x.text, x.line, x.column) for x in lexer.getAllTokens()]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_scanner_equals_lexer(text):
+    lexer = CuneiformLexer(antlr4.InputStream(text))
+    scanner = CuneiformScanner(antlr4.InputStream(text))
+    for x in (lexer, scanner):
+        x.removeErrorListeners()
+    assert tokens(scanner) == tokens(lexer)
@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+
+import pytest
+
+from writingsumerianparser.parser import parseText, validateText
+from writingsumerianparser.server import Client, handle
+
+
+TEXT = '1.\tlugal-e ]\n2.\t{d}en-lil2'
+
+
+def request(**fields):
+    return json.loads(handle(json.dumps({'id': 1, 'text': TEXT, **fields})))
+
+
+def test_parse():
+    response = request()
+    assert response['id'] == 1
+    assert response['tables']['signs'] == parseText(TEXT, backend='dict')[3]
+
+
+def test_validate():
+    assert request(mode='validate')['errors'] == json.loads(json.dumps(validateText(TEXT)))
+
+
+def test_columns():
+    tables = request(options={'columns': {'signs': ['value']}})['tables']
+    assert tables == {'signs': {'value': ['lugal', 'e', 'd', 'en', 'lil2']}}
+
+
+@pytest.mark.parametrize('fields', [{'mode': 'check'}, {'mode': 'validate', 'options': {'columns': ['signs']}}, {'options': {'backend': 'dict'}}])
+def test_errors(fields):
+    response = request(**fields)
+    assert response['id'] == 1 and 'error' in response
+
+
+def test_client(monkeypatch):
+    # The server started by the client imports this checkout
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    monkeypatch.setenv('PYTHONPATH', os.pathsep.join([root] + sys.path))
+    with Client() as client:
+        assert client.parse(TEXT)['signs'] == parseText(TEXT, backend='dict')[3]
+        with pytest.raises(RuntimeError):
+            client.parse(TEXT, mode='check')
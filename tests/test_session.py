@@ -0,0 +1,44 @@
+from benchmarks import generate
+from writingsumerianparser import ParseSession, parseText
+
+
+TEXT = '@obverse\n1.\t%sec=A lugal-e [x]\n2.\t{d}en-lil2\n\n3.\t%a a-na ki-\n4.\tta\n5.\tlugal ]'
+
+
+def assertSameTables(a, b):
+    assert all(x.equals(y) for x, y in zip(a, b))
+
+
+def test_session_equals_parse():
+    assertSameTables(ParseSession(TEXT).tables, parseText(TEXT))
+
+
+def test_edits():
+    session = ParseSession(TEXT)
+    lines = TEXT.split('\n')
+    tables, changed = session.setLine(2, '2.\t{d}nin-lil2')
+    lines[2] = '2.\t{d}nin-lil2'
+    assertSameTables(tables, parseText('\n'.join(lines)))
+    assert 2 in changed and 4 not in changed
+    tables, changed = session.edit(4, 6, ['3.\t%s e2'])
+    lines[4:6] = ['3.\t%s e2']
+    assertSameTables(tables, parseText('\n'.join(lines)))
+    assert 4 in changed
+
+
+def test_error_labels():
+    for text in ['1.\t_a\n2.\tb_', '1.\tlugal ]\n2.\t_a\n3.\tki\n4.\tb_ ]']:
+        assertSameTables(ParseSession(text).tables, parseText(text))
+
+
+def test_edits_of_generated_text():
+    # Edits before, between and after units, changing the number of lines, words and sections
+    lines = ''.join(line for _, text in generate.corpus(1, 3, lines=(40, 40)) for line in text).split('\n')
+    for columns in [None, {'signs': ['line_no', 'word_no', 'value', 'line_no_code', 'start_col_code'], 'words': None, 'compounds': ['section_no']}]:
+        session = ParseSession('\n'.join(lines), columns=columns)
+        edited = list(lines)
+        for start, stop, new in [(5, 6, ['5.\t%sec=B _a-na_ lugal']), (20, 20, ['20.\tki ]', '21.\ten-lil2']), (2, 4, []), (len(edited)-1, len(edited), ['$ blank space']), (0, 0, ['@reverse'])]:
+            tables, _ = session.edit(start, stop, new)
+            edited[start:stop] = new
+            expected = parseText('\n'.join(edited), columns=columns)
+            assert all(x is None and y is None or x.equals(y) for x, y in zip(tables, expected))
@@ -0,0 +1,54 @@
+import filecmp
+import os
+
+import pytest
+
+from benchmarks import generate
+from writingsumerianparser import parseFile
+from writingsumerianparser.shards import splitCorpus, parseShard, mergeShards, shardIdentifiers
+
+
+def writeCorpus(path, texts, seed=0, lines=(1, 40)):
+    with open(path, 'w') as f:
+        for identifier, content in generate.corpus(texts, seed, lines=lines):
+            f.write(f'@text {identifier}\n' + ''.join(content))
+
+
+def assertSameFiles(a, b):
+    assert sorted(os.listdir(a)) == sorted(os.listdir(b))
+    for name in os.listdir(a):
+        assert filecmp.cmp(os.path.join(a, name), os.path.join(b, name), shallow=False), name
+
+
+@pytest.mark.parametrize('shards, format', [(3, 'csv'), (12, 'csv'), (5, 'copy'), (5, 'parquet'), (5, 'arrow')])
+def test_merge_equals_single_run(tmp_path, shards, format):
+    if format in ('parquet', 'arrow'):
+        pytest.importorskip('pyarrow')
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, 8)
+    single = tmp_path / 'single'
+    single.mkdir()
+    parseFile(corpus, str(single), 'c/', format=format, rowGroupSize=50)
+
+    manifest = splitCorpus(corpus, shards)
+    identifiers = shardIdentifiers(manifest)
+    assert sum(identifiers, []) == [f'X{i:06d}' for i in range(8)]
+    if shards > 8:
+        assert [] in identifiers
+    sources = []
+    for i in range(shards):
+        source = tmp_path / str(i)
+        source.mkdir()
+        parseShard(manifest, i, str(source), 'c/', format=format, rowGroupSize=50)
+        sources.append(str(source))
+    mergeShards(manifest, sources, str(tmp_path / 'merged'), rowGroupSize=50)
+    assertSameFiles(single, tmp_path / 'merged')
+
+
+def test_changed_corpus_is_refused(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, 4)
+    manifest = splitCorpus(corpus, 2)
+    writeCorpus(corpus, 4, seed=1)
+    with pytest.raises(ValueError):
+        parseShard(manifest, 1, str(tmp_path), 'c/')
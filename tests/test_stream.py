@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks import generate
+from writingsumerianparser import iterParseFile
+from writingsumerianparser.parser import parseLines
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_tables_per_text_in_input_order(tmp_path, processes):
+    corpus = str(tmp_path / 'corpus.atf')
+    texts = list(generate.corpus(10, 1, lines=(1, 15)))
+    with open(corpus, 'w') as f:
+        for identifier, content in texts:
+            f.write(f'@text {identifier}\n' + ''.join(content))
+    results = list(iterParseFile(corpus, processes=processes, chunksize=3))
+    assert [x for x, _ in results] == [x for x, _ in texts]
+    for (_, content), (_, tables) in zip(texts, results):
+        assert all(x.equals(y) for x, y in zip(tables, parseLines(content)))
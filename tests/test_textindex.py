@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from benchmarks import generate
+from writingsumerianparser import TextIndex, iterParseFile
+from writingsumerianparser.parser import readTexts
+
+
+def writeCorpus(path, texts, seed=0, newline='\n'):
+    with open(path, 'w', newline=newline) as f:
+        for identifier, content in generate.corpus(texts, seed, lines=(1, 20)):
+            f.write(f'@text {identifier}\n' + ''.join(content))
+
+
+def fileTexts(path):
+    with open(path) as f:
+        return list(readTexts(f))
+
+
+def test_build_load_and_rebuild(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, 5)
+    assert TextIndex.load(corpus) is None
+    index = TextIndex.open(corpus)
+    assert os.path.exists(TextIndex.sidecar(corpus))
+    assert TextIndex.load(corpus).entries == index.entries
+    assert index.identifiers() == [identifier for identifier, _ in fileTexts(corpus)]
+
+    # A changed corpus makes the saved index stale, open builds it again
+    with open(corpus, 'a') as f:
+        f.write('@text Y1\n1.\tlugal\n')
+    assert TextIndex.load(corpus) is None
+    index = TextIndex.open(corpus)
+    assert index.identifiers()[-1] == 'Y1'
+    assert TextIndex.load(corpus).entries == index.entries
+    stat = os.stat(corpus)
+    os.utime(corpus, ns=(stat.st_atime_ns, stat.st_mtime_ns+10**9))
+    assert TextIndex.load(corpus) is None
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_texts_equal_read_texts(tmp_path, newline):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, 6, newline=newline)
+    with open(corpus, 'a', newline=newline) as f:
+        # Signs of several bytes move the byte offsets away from the character offsets
+        f.write('@text Y1\n1.\tšu-du₃ {d}en-lil₂\n  @text Y2\n1.\tĝiš\n')
+    index = TextIndex.open(corpus)
+    assert list(index.texts()) == fileTexts(corpus)
+    with open(corpus, 'rb') as f:
+        data = f.read()
+    for identifier, start, end in index.entries:
+        assert data[start:end].lstrip().startswith(b'@text ' + identifier.encode())
+    assert index.entries[-1][2] == len(data)
+
+
+def test_identifiers_select_texts(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, 8)
+    with open(corpus, 'a') as f:
+        f.write('@text X000002\n1.\tki ]\n')
+    selected = ['X000005', 'X000002', 'X000000']
+    full = [(identifier, tables) for identifier, tables in iterParseFile(corpus) if identifier in selected]
+    some = list(iterParseFile(corpus, identifiers=selected))
+    # In file order, a repeated identifier with each of its texts
+    assert [x for x, _ in some] == [x for x, _ in full] == ['X000000', 'X000002', 'X000005', 'X000002']
+    for (_, a), (_, b) in zip(full, some):
+        assert all(x.equals(y) for x, y in zip(a, b))
+    with pytest.raises(KeyError):
+        list(iterParseFile(corpus, identifiers=['Z']))
+
+
+def test_split(tmp_path):
+    corpus = str(tmp_path / 'corpus.atf')
+    writeCorpus(corpus, 10)
+    index = TextIndex.open(corpus)
+    parts = index.split(3)
+    assert sum(parts, []) == index.identifiers()
+    assert all(parts)
@@ -0,0 +1,13 @@
+import pytest
+
+from benchmarks import generate
+from writingsumerianparser import parseText, validateText
+
+
+TEXTS = ['1.\tlugal-e', '1.\tlugal-e ]\n2.\t[ki\nno tab', '1.\t_lugal\n2.\t2(XYZ)'] + [''.join(x) for _, x in generate.corpus(10, 6)]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_validation_equals_parse_errors(text):
+    errors = parseText(text, backend='dict')[7]
+    assert validateText(text) == [list(row) for row in zip(*errors.values())]
@@ -1,2 +1,8 @@
-from .parser import parse, parseText, parseFile
-from .preprocess import preprocess
+from .parser import parse, parseText, parseFile, iterParseFile, warmUp, validateText, validateFile
+from .session import ParseSession
+from .cache import ParseCache
+from .dfa import saveDFA, loadDFA
+from .metrics import Metrics
+from .preprocess import preprocess, preprocessTexts
+from .textindex import TextIndex
+from .dictionary import SignDictionary
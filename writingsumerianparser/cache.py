@@ -0,0 +1,87 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+
+def sourceVersion():
+    # Any change to the grammar, the listener or the table construction invalidates the cache
+    root = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(root, '*.py')) + glob.glob(os.path.join(root, 'grammar', '*.py'))):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class ParseCache:
+
+    def __init__(self, directory, maxSize=2**30):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.version = sourceVersion()
+        os.makedirs(os.path.join(directory, 'manifests'), exist_ok=True)
+
+    def key(self, lines, **kwargs):
+        h = hashlib.sha256(self.version.encode())
+        h.update(repr(sorted(kwargs.items())).encode())
+        for line in lines:
+            h.update(b'\n')
+            h.update(line.encode())
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key+'.pickle')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                tables = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return tables
+
+    def put(self, key, tables):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written to a temporary file first, so concurrent workers never read partial entries
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(tables, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def evict(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '??', '*.pickle')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        size = sum(x[1] for x in entries)
+        for _, entrySize, path in sorted(entries):
+            if size <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= entrySize
+
+    def manifestPath(self, name):
+        return os.path.join(self.directory, 'manifests', hashlib.sha256(name.encode()).hexdigest()+'.json')
+
+    def loadManifest(self, name):
+        try:
+            with open(self.manifestPath(name)) as f:
+                return json.load(f)
+        except OSError:
+            return {}
+
+    def saveManifest(self, name, manifest):
+        with open(self.manifestPath(name), 'w') as f:
+            json.dump(manifest, f)
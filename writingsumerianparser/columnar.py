@@ -0,0 +1,150 @@
+try:
+    from .listener import SIGNS_SCHEMA, COMPOUNDS_SCHEMA, WORDS_SCHEMA
+    from .dictionary import ENCODED
+except:
+    from listener import SIGNS_SCHEMA, COMPOUNDS_SCHEMA, WORDS_SCHEMA
+    from dictionary import ENCODED
+
+
+# Column kinds of the tables written by parseFile, as in the listener's schemas
+SCHEMAS = {
+    'transliterations': [('transliterationIdentifier', 'str'), ('name', 'str'), ('corpus', 'str')],
+    'surfaces': [('surface', 'str'), ('data', 'str'), ('comment', 'str')],
+    'blocks': [('surface_no', 'int'), ('block', 'str'), ('data', 'str'), ('comment', 'str')],
+    'lines': [('block_no', 'int'), ('line', 'str'), ('comment', 'str')],
+    'signs': SIGNS_SCHEMA + [('line_no_code', 'int'), ('start_col_code', 'int'), ('stop_col_code', 'int')],
+    'compounds': COMPOUNDS_SCHEMA,
+    'words': WORDS_SCHEMA,
+    'sections': [('section_name', 'str'), ('composition', 'str')],
+    'errors': [('line_no', 'int'), ('column', 'int'), ('symbol', 'str'), ('msg', 'str')],
+    # parseFile(dictionary=True)
+    **{table: [('id', 'int'), (name, 'str')] for name, table in ENCODED.items()}
+}
+PREFIX = [('transliterationIdentifier', 'str'), ('index', 'int')]
+
+
+def arrowType(kind):
+    import pyarrow as pa
+
+    if kind in ('int', 'nullable'):
+        return pa.int64()
+    if kind in ('bool', 'flag'):
+        return pa.bool_()
+    if isinstance(kind, list):
+        # Categories, stored once per row group
+        return pa.dictionary(pa.int8(), pa.string())
+    return pa.string()
+
+
+class ArrowWriter:
+    # Collects the frames of consecutive texts and writes them as one Parquet row group or Arrow record batch
+
+    def __init__(self, path, schema, format='parquet', rowGroupSize=65536, prefix=True):
+        import pyarrow as pa
+
+        self.prefix = prefix
+        self.schema = pa.schema([(name, arrowType(kind)) for name, kind in (PREFIX if prefix else []) + schema])
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        elif format == 'arrow':
+            self.writer = pa.ipc.new_file(path, self.schema)
+        else:
+            raise ValueError(f'Unknown format: {format}')
+        self.rowGroupSize = rowGroupSize
+        self.frames = []
+        self.identifiers = []
+        self.rows = 0
+
+    def write(self, table, identifier=None):
+        if len(table):
+            self.frames.append(table)
+            self.identifiers.append(identifier)
+            self.rows += len(table)
+            if self.rows >= self.rowGroupSize:
+                self.flush()
+
+    def flush(self):
+        import numpy as np
+        import pandas as pd
+        import pyarrow as pa
+
+        if not self.frames:
+            return
+        table = pd.concat(self.frames, ignore_index=True) if len(self.frames) > 1 else self.frames[0]
+        fields = list(self.schema)
+        arrays = []
+        if self.prefix:
+            lengths = [len(x) for x in self.frames]
+            arrays.append(pa.array(np.repeat(np.array(self.identifiers, dtype=object), lengths), fields[0].type))
+            arrays.append(pa.array(np.concatenate([x.index.to_numpy() for x in self.frames]), fields[1].type))
+            fields = fields[2:]
+        for field, name in zip(fields, table.columns):
+            arrays.append(pa.Array.from_pandas(table[name], type=field.type))
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if isinstance(self.writer, pa.ipc.RecordBatchFileWriter):
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write_batch(batch, row_group_size=batch.num_rows)
+        self.frames = []
+        self.identifiers = []
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def writeArrowTables(writers, tables, identifier, corpus):
+    if tables is not None:
+        for writer, table in zip(writers, tables):
+            writer.write(table, corpus+identifier)
+
+
+def readArrow(path, format='parquet'):
+    import pyarrow as pa
+
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(path, schema=pq.read_schema(path))
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def mergeArrowFiles(paths, filename, format='parquet', rowGroupSize=65536, prefix=True):
+    # The rows of several files written by ArrowWriter, one after the other in a single file, in the
+    # row groups ArrowWriter would have written them in: texts are added until a group has at least
+    # rowGroupSize rows, tables without the prefix columns of the texts are written as one group
+    import numpy as np
+    import pyarrow as pa
+
+    table = pa.concat_tables([readArrow(path, format) for path in paths])
+    bounds = [0, table.num_rows]
+    if prefix and table.num_rows:
+        identifiers = table.column(0).to_numpy()
+        starts = np.flatnonzero(identifiers[1:] != identifiers[:-1]) + 1
+        bounds = [0]
+        for stop in list(starts) + [table.num_rows]:
+            if stop - bounds[-1] >= rowGroupSize:
+                bounds.append(stop)
+        if bounds[-1] != table.num_rows:
+            bounds.append(table.num_rows)
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(filename, table.schema)
+    else:
+        writer = pa.ipc.new_file(filename, table.schema)
+    with writer:
+        for start, stop in zip(bounds, bounds[1:]):
+            if stop > start:
+                batch = table.slice(start, stop-start).combine_chunks().to_batches()[0]
+                if format == 'parquet':
+                    writer.write_batch(batch, row_group_size=batch.num_rows)
+                else:
+                    writer.write_batch(batch)
@@ -0,0 +1,141 @@
+import os
+import pickle
+import tempfile
+
+from antlr4.PredictionContext import PredictionContext, SingletonPredictionContext, ArrayPredictionContext
+from antlr4.atn.ATNConfig import ATNConfig, LexerATNConfig
+from antlr4.atn.ATNConfigSet import ATNConfigSet, OrderedATNConfigSet
+from antlr4.atn.LexerATNSimulator import LexerATNSimulator
+from antlr4.atn.ParserATNSimulator import ParserATNSimulator
+from antlr4.dfa.DFAState import DFAState
+
+try:
+    from .cache import sourceVersion
+except:
+    from cache import sourceVersion
+
+try:
+    from grammar.CuneiformLexer import CuneiformLexer
+    from grammar.CuneiformParser import CuneiformParser
+except:
+    from .grammar.CuneiformLexer import CuneiformLexer
+    from .grammar.CuneiformParser import CuneiformParser
+
+
+# The DFA built by ANTLR's prediction is shared by all lexers and parsers of a process. It is stored
+# as plain tuples and rebuilt with the runtime's constructors, as the cached hash codes of its
+# objects are only valid within the process that computed them.
+
+def dumpContexts(dfas):
+    contexts = [None]
+    ids = {id(PredictionContext.EMPTY): 0}
+
+    def add(ctx):
+        if ctx is None:
+            return None
+        if id(ctx) in ids:
+            return ids[id(ctx)]
+        if isinstance(ctx, ArrayPredictionContext):
+            entry = ([add(x) for x in ctx.parents], list(ctx.returnStates))
+        else:
+            entry = (add(ctx.parentCtx), ctx.returnState)
+        ids[id(ctx)] = len(contexts)
+        contexts.append(entry)
+        return ids[id(ctx)]
+
+    for dfa in dfas:
+        for state in dfa._states:
+            for config in state.configs:
+                add(config.context)
+    return contexts, ids
+
+
+def dumpDFA(dfas, lexer):
+    contexts, ids = dumpContexts(dfas)
+    error = (LexerATNSimulator if lexer else ParserATNSimulator).ERROR
+    result = []
+    for dfa in dfas:
+        states = []
+        for state in sorted(dfa._states, key=lambda x: x.stateNumber):
+            if state.predicates is not None or state.lexerActionExecutor is not None or state.configs.hasSemanticContext:
+                # Not produced by this grammar, which has neither predicates nor lexer actions
+                raise ValueError('Unsupported DFA state')
+            configs = state.configs
+            states.append((
+                state.stateNumber,
+                [(c.state.stateNumber, c.alt, ids[id(c.context)], c.passedThroughNonGreedyDecision if lexer else c.reachesIntoOuterContext, False if lexer else c.precedenceFilterSuppressed) for c in configs],
+                (configs.fullCtx, configs.uniqueAlt, configs.conflictingAlts, configs.dipsIntoOuterContext),
+                None if state.edges is None else [None if x is None else -1 if x is error else x.stateNumber for x in state.edges],
+                state.isAcceptState,
+                state.prediction,
+                state.requiresFullContext))
+        result.append((dfa.decision, None if dfa.s0 is None else dfa.s0.stateNumber, states))
+    return contexts, result
+
+
+def buildDFA(dfas, atn, data, lexer):
+    contexts = [PredictionContext.EMPTY]
+    for entry in data[0][1:]:
+        if isinstance(entry[0], list):
+            contexts.append(ArrayPredictionContext([None if x is None else contexts[x] for x in entry[0]], entry[1]))
+        else:
+            contexts.append(SingletonPredictionContext.create(None if entry[0] is None else contexts[entry[0]], entry[1]))
+
+    error = (LexerATNSimulator if lexer else ParserATNSimulator).ERROR
+    for dfa, (decision, s0, entries) in zip(dfas, data[1]):
+        if dfa._states or dfa.s0 is not None:
+            # Already built in this process
+            continue
+        states = {}
+        for number, configs, (fullCtx, uniqueAlt, conflictingAlts, dips), edges, isAcceptState, prediction, requiresFullContext in entries:
+            configSet = OrderedATNConfigSet() if lexer else ATNConfigSet(fullCtx)
+            for stateNumber, alt, context, x, suppressed in configs:
+                if lexer:
+                    config = LexerATNConfig(atn.states[stateNumber], alt, contexts[context])
+                    config.passedThroughNonGreedyDecision = x
+                else:
+                    config = ATNConfig(atn.states[stateNumber], alt, contexts[context])
+                    config.reachesIntoOuterContext = x
+                    config.precedenceFilterSuppressed = suppressed
+                configSet.configs.append(config)
+            configSet.uniqueAlt = uniqueAlt
+            configSet.conflictingAlts = conflictingAlts
+            configSet.dipsIntoOuterContext = dips
+            configSet.setReadonly(True)
+            state = DFAState(number, configSet)
+            state.isAcceptState = isAcceptState
+            state.prediction = prediction
+            state.requiresFullContext = requiresFullContext
+            states[number] = (state, edges)
+        for state, edges in states.values():
+            if edges is not None:
+                state.edges = [None if x is None else error if x == -1 else states[x][0] for x in edges]
+            dfa._states[state] = state
+        dfa.s0 = None if s0 is None else states[s0][0]
+
+
+def saveDFA(path):
+    data = {
+        'version': sourceVersion(),
+        'lexer': dumpDFA(CuneiformLexer.decisionsToDFA, True),
+        'parser': dumpDFA(CuneiformParser.decisionsToDFA, False)
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def loadDFA(path):
+    # Returns False if there is no file or it was saved for another grammar
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return False
+    if data.get('version') != sourceVersion():
+        return False
+    buildDFA(CuneiformLexer.decisionsToDFA, CuneiformLexer.atn, data['lexer'], True)
+    buildDFA(CuneiformParser.decisionsToDFA, CuneiformParser.atn, data['parser'], False)
+    return True
@@ -0,0 +1,64 @@
+# Columns of the signs table written as ids into dictionaries shared by all texts of a run, and the
+# tables the dictionaries are written to
+ENCODED = {'value': 'sign_values', 'sign_spec': 'sign_specs', 'crits': 'sign_crits'}
+
+
+def encodedSchema(schema, kind):
+    return [(name+'_id', kind) if name in ENCODED else (name, k) for name, k in schema]
+
+
+class SignDictionary:
+
+    def __init__(self, strings=None):
+        self.strings = {name: list((strings or {}).get(name, [])) for name in ENCODED}
+        self.ids = {name: {x: i for i, x in enumerate(self.strings[name])} for name in ENCODED}
+
+    def encode(self, signs):
+        import pandas as pd
+
+        signs = signs.copy(deep=False)
+        for name in ENCODED:
+            if name not in signs:
+                continue
+            ids = self.ids[name]
+            strings = self.strings[name]
+            codes = []
+            for x in signs[name].tolist():
+                if x is None:
+                    codes.append(None)
+                    continue
+                i = ids.get(x)
+                if i is None:
+                    i = ids[x] = len(strings)
+                    strings.append(x)
+                codes.append(i)
+            signs[name] = pd.array(codes, dtype='Int64')
+        return signs.rename(columns={name: name+'_id' for name in ENCODED})
+
+    def encodeTables(self, tables):
+        if tables is None:
+            return None
+        surfaces, blocks, lines, signs, compounds, words, sections, errors = tables
+        return surfaces, blocks, lines, self.encode(signs) if signs is not None else None, compounds, words, sections, errors
+
+    def decode(self, signs):
+        # The plain signs table from an encoded one
+        import pandas as pd
+
+        signs = signs.copy(deep=False)
+        for name in ENCODED:
+            if name+'_id' not in signs:
+                continue
+            strings = pd.Series(self.strings[name] + [None], dtype=object)
+            codes = signs[name+'_id'].astype('Int64').fillna(len(strings)-1).to_numpy(dtype='int64')
+            signs[name+'_id'] = strings.take(codes).to_numpy()
+        return signs.rename(columns={name+'_id': name for name in ENCODED})
+
+    def tables(self):
+        import pandas as pd
+
+        return {table: pd.DataFrame({'id': range(len(self.strings[name])), name: pd.Series(self.strings[name], dtype=object)}) for name, table in ENCODED.items()}
+
+    def fromTables(tables):
+        # The dictionary written by parseFile(dictionary=True), from its tables read back as frames
+        return SignDictionary({name: tables[table].sort_values('id')[name].tolist() for name, table in ENCODED.items()})
@@ -1,4 +1,8 @@
-import re
+from array import array
+import functools
+
+from antlr4 import ParserRuleContext
+from antlr4.tree.Tree import TerminalNode
 
 try:
     from grammar.CuneiformParser import CuneiformParser
@@ -8,19 +12,218 @@ except:
     from .grammar.CuneiformListener import CuneiformListener
 
 
-numberSigns = re.compile(r'(ŠAR2|IKU|AŠ|DIŠ|BUR3|GEŠ2|U|BARIG|EŠE3|BAN2|ŠAR’U|ŠARGAL|GEŠ’U|BUR’U|GEŠMIN’U|ŠAR’UGAL|ŠARKID|AŠ×DIŠ|AŠ×DIŠ@t|DIŠ@t|GEŠ2@t|BAD×DIŠ|BAD×DIŠ@t|IKU@t)(@[cf])?(@v)?|GEŠ2@c@d|GEŠ2@c@90|GEŠ’U@c@d|DIŠ×U@t|AŠ@c×AŠ|DIŠ@c×DIŠ')
+# Every valid number sign specification, a set lookup instead of a regular expression per sign
+numberSigns = frozenset([name+c+v
+    for name in ['ŠAR2', 'IKU', 'AŠ', 'DIŠ', 'BUR3', 'GEŠ2', 'U', 'BARIG', 'EŠE3', 'BAN2', 'ŠAR’U', 'ŠARGAL', 'GEŠ’U', 'BUR’U', 'GEŠMIN’U', 'ŠAR’UGAL', 'ŠARKID', 'AŠ×DIŠ', 'AŠ×DIŠ@t', 'DIŠ@t', 'GEŠ2@t', 'BAD×DIŠ', 'BAD×DIŠ@t', 'IKU@t']
+    for c in ['', '@c', '@f']
+    for v in ['', '@v']] + ['GEŠ2@c@d', 'GEŠ2@c@90', 'GEŠ’U@c@d', 'DIŠ×U@t', 'AŠ@c×AŠ', 'DIŠ@c×DIŠ'])
+
+INTERNAL_CONDITIONS = frozenset('[]⸢⸣')
+STRIP_CONDITIONS = str.maketrans('', '', '[]⸢⸣')
+TIMES = str.maketrans('xX', '××')
+
+
+def tokenText(ctx):
+    # Rules matching a single token: its text, without the recursion and joins of getText
+    children = ctx.children
+    if children is not None and len(children) == 1 and isinstance(children[0], TerminalNode):
+        return children[0].symbol.text
+    return ruleText(ctx)
+
+
+def ruleText(ctx):
+    if ctx.parser.buildParseTrees:
+        return ctx.getText()
+    # Without a parse tree: the consumed tokens, with those conjured by error recovery in their place
+    tokens = ctx.parser.getTokenStream()
+    conjured = getattr(ctx, 'conjured', [])
+    parts = []
+    j = 0
+    for i in range(ctx.start.tokenIndex, ctx.stop.tokenIndex+1 if ctx.stop is not None else 0):
+        while j < len(conjured) and conjured[j][0] <= i:
+            parts.append(conjured[j][1])
+            j += 1
+        parts.append(tokens.get(i).text)
+    parts.extend(text for _, text in conjured[j:])
+    return ''.join(parts)
+
+
+def walkTree(listener, tree):
+    # Same events as antlr4.ParseTreeWalker, but the enter and exit methods are looked up once per
+    # rule and listener class, rules without a method are skipped and terminals are not visited
+    methods = listenerMethods(type(listener))
+    stack = [(tree, False)]
+    while stack:
+        ctx, exiting = stack.pop()
+        enter, exit = methods[ctx.getRuleIndex()]
+        if exiting:
+            if exit is not None:
+                exit(listener, ctx)
+            continue
+        if enter is not None:
+            enter(listener, ctx)
+        stack.append((ctx, True))
+        children = ctx.children
+        if children:
+            for child in reversed(children):
+                if isinstance(child, ParserRuleContext):
+                    stack.append((child, False))
+
+
+@functools.lru_cache(maxsize=None)
+def listenerMethods(cls):
+    methods = []
+    for name in CuneiformParser.ruleNames:
+        name = name[0].upper()+name[1:]
+        pair = []
+        for prefix in ('enter', 'exit'):
+            method = getattr(cls, prefix+name, None)
+            pair.append(None if method is None or method is getattr(CuneiformListener, prefix+name, None) else method)
+        methods.append(tuple(pair))
+    return methods
+
+
+SIGN_TYPES = ['value', 'sign', 'number', 'punctuation', 'description', 'damage']
+INDICATOR_TYPES = ['none', 'left', 'right', 'center']
+CONDITIONS = ['intact', 'lost', 'damaged', 'inserted', 'deleted']
+PN_TYPES = ['person', 'place', 'god', 'water', 'field', 'temple', 'month', 'object', 'ethnicity']
+LANGUAGES = ['sumerian', 'akkadian', 'hittite']
+
+# Column kinds: 'int', 'bool', 'str' (or None), 'flag' (True, False or None), 'nullable' (int or None)
+# or a list of categories stored as small integer codes
+SIGNS_SCHEMA = [
+    ('line_no', 'int'), 
+    ('word_no', 'int'), 
+    ('value', 'str'), 
+    ('sign_spec', 'str'), 
+    ('type', SIGN_TYPES),  
+    ('indicator_type', INDICATOR_TYPES),
+    ('phonographic', 'flag'),
+    ('condition', CONDITIONS),
+    ('stem', 'flag'),
+    ('crits', 'str'), 
+    ('comment', 'str'),
+    ('newline', 'bool'),
+    ('inverted', 'bool'),
+    ('ligature', 'bool'),
+    ('start_col', 'int'),
+    ('stop_col', 'int')
+]
+COMPOUNDS_SCHEMA = [
+    ('pn_type', PN_TYPES),
+    ('language', LANGUAGES),
+    ('section_no', 'nullable'),
+    ('comment', 'str')
+]
+WORDS_SCHEMA = [
+    ('compound_no', 'int'),
+    ('capitalized', 'bool')
+]
+
+
+class Columns:
+
+    def __init__(self, schema, names=None):
+        # With names only those columns are kept, append still takes the values of the whole schema
+        if names is not None:
+            indices = [i for i, (name, _) in enumerate(schema) if name in names]
+            schema = [schema[i] for i in indices]
+            self.append = self.appendProjected
+        self.schema = schema
+        self.count = 0
+        self.buffers = []
+        self.encoders = []
+        for name, kind in schema:
+            if kind in ('int', 'bool', 'flag') or isinstance(kind, list):
+                buffer = array('q' if kind == 'int' else 'b')
+            else:
+                buffer = []
+            if kind == 'flag':
+                encoder = {None: -1, False: 0, True: 1}.__getitem__
+            elif isinstance(kind, list):
+                encoder = dict([(None, -1)] + [(x, i) for i, x in enumerate(kind)]).__getitem__
+            else:
+                encoder = None
+            setattr(self, name, buffer)
+            self.buffers.append(buffer)
+            self.encoders.append(encoder)
+        if names is not None:
+            self.projection = list(zip(self.buffers, self.encoders, indices))
+
+    def __len__(self):
+        # Without any column kept the rows are only counted
+        return len(self.buffers[0]) if self.buffers else self.count
+
+    def append(self, *values):
+        for buffer, encoder, value in zip(self.buffers, self.encoders, values):
+            buffer.append(encoder(value) if encoder else value)
+
+    def appendProjected(self, *values):
+        self.count += 1
+        for buffer, encoder, i in self.projection:
+            value = values[i]
+            buffer.append(encoder(value) if encoder else value)
+
+    def extend(self, other):
+        self.count += len(other)
+        for buffer, x in zip(self.buffers, other.buffers):
+            buffer.extend(x)
+
+    def slice(self, start, stop):
+        columns = Columns(self.schema)
+        columns.count = len(range(len(self))[start:stop])
+        for buffer, x in zip(columns.buffers, self.buffers):
+            buffer.extend(x[start:stop])
+        return columns
+
+    def take(self, indices):
+        columns = Columns(self.schema)
+        columns.count = len(indices)
+        for buffer, x in zip(columns.buffers, self.buffers):
+            buffer.extend(x[i] for i in indices)
+        return columns
+
+    def project(self, names):
+        # The named columns, sharing their buffers
+        columns = Columns([])
+        columns.schema = [x for x in self.schema if x[0] in names]
+        columns.count = len(self)
+        for name, _ in columns.schema:
+            setattr(columns, name, getattr(self, name))
+            columns.buffers.append(getattr(self, name))
+        return columns
+
+    def decode(self, name):
+        kind = dict(self.schema)[name]
+        buffer = getattr(self, name)
+        if kind == 'bool':
+            return [x == 1 for x in buffer]
+        if kind == 'flag':
+            return [None if x < 0 else x == 1 for x in buffer]
+        if isinstance(kind, list):
+            return [None if x < 0 else kind[x] for x in buffer]
+        return list(buffer)
+
+    def shift(self, name, offset, start=0):
+        if name not in dict(self.schema) or not offset:
+            return
+        buffer = getattr(self, name)
+        for i in range(start, len(buffer)):
+            if buffer[i] is not None:
+                buffer[i] += offset
 
 
 class Listener(CuneiformListener):
 
-    def __init__(self, errorListener):
+    def __init__(self, errorListener, columns=None):
+        # columns: the columns to collect of the signs, words and compounds tables, None for all of them
         self.errorListener = errorListener
 
         self.default_stem = None
 
-        self.signs = []
-        self.words = []
-        self.compounds = []
+        self.signs = Columns(SIGNS_SCHEMA, columns['signs'] if columns is not None else None)
+        self.words = Columns(WORDS_SCHEMA, columns['words'] if columns is not None else None)
+        self.compounds = Columns(COMPOUNDS_SCHEMA, columns['compounds'] if columns is not None else None)
         self.sections = []
 
         self.line_no = 0
@@ -52,23 +255,60 @@ class Listener(CuneiformListener):
 
         self.stem = self.default_stem
 
+    # Everything but the collected rows, sufficient to continue a walk at a line boundary
+    stateAttributes = [
+        'default_stem',
+        'col',
+        'sign_type',
+        'phonographic',
+        'logogramm',
+        'indicator',
+        'alignment',
+        'condition',
+        'damaged',
+        'newline',
+        'inverted',
+        'ligature',
+        'value',
+        'signSpec',
+        'crits',
+        'spec',
+        'capitalized',
+        'pn_type',
+        'language',
+        'comments',
+        'compoundComments',
+        'section',
+        'stem'
+    ]
+
+    def getState(self):
+        return tuple(tuple(x) if isinstance(x, list) else x for x in (getattr(self, attr) for attr in self.stateAttributes))
+
+    def setState(self, state):
+        for attr, x in zip(self.stateAttributes, state):
+            setattr(self, attr, list(x) if isinstance(x, tuple) else x)
+
     def commit(self, start, stop):
-        self.signs.append([self.line_no, 
-                           len(self.words),
-                           self.value if self.value else None,
-                           self.signSpec if self.signSpec else None, 
-                           'damage' if self.sign_type == 'sign' and re.search('[…X]', self.value) else self.sign_type, 
-                           self.alignment if self.indicator else 'none',
-                           False if self.logogramm else self.phonographic, 
-                           'lost' if self.value == '…' else 'damaged' if self.damaged else self.condition,
-                           self.stem, 
-                           self.crits,
-                           '; '.join(self.comments) if self.comments else None, 
-                           self.newline, 
-                           self.inverted,
-                           self.ligature,
-                           start,
-                           stop])
+        self.signs.append(self.line_no, 
+                          len(self.words),
+                          self.value if self.value else None,
+                          self.signSpec if self.signSpec else None, 
+                          'damage' if self.sign_type == 'sign' and ('…' in self.value or 'X' in self.value) else self.sign_type, 
+                          self.alignment if self.indicator else 'none',
+                          False if self.logogramm else self.phonographic, 
+                          'lost' if self.value == '…' else 'damaged' if self.damaged else self.condition,
+                          self.stem, 
+                          self.crits,
+                          '; '.join(self.comments) if self.comments else None, 
+                          self.newline, 
+                          self.inverted,
+                          self.ligature,
+                          start,
+                          stop)
+        self.resetSign()
+
+    def resetSign(self):
         self.sign_type = None
         self.value = ''
         self.signSpec = ''
@@ -81,16 +321,19 @@ class Listener(CuneiformListener):
         self.damaged = False
 
     def commitWord(self):
-        self.words.append([len(self.compounds), self.capitalized])
+        self.words.append(len(self.compounds), self.capitalized)
         self.capitalized = False
 
     def commitCompound(self):
-        self.compounds.append([self.pn_type, self.language, len(self.sections)-1 if self.section else -1, '; '.join(self.compoundComments) if self.compoundComments else None])
+        self.compounds.append(self.pn_type, self.language, len(self.sections)-1 if self.section else None, '; '.join(self.compoundComments) if self.compoundComments else None)
         self.compoundComments = []
         self.pn_type = None
 
     def exitShift(self, ctx:CuneiformParser.ShiftContext):
-        var = ctx.getText()[1:]
+        self.shift(tokenText(ctx))
+
+    def shift(self, text):
+        var = text[1:]
         val = None
         if '=' in var:
             var, val = var.split('=')
@@ -272,19 +515,25 @@ class Listener(CuneiformListener):
 
 
     def exitValueAtom(self, ctx:CuneiformParser.ValueAtomContext):
-        self.commit(ctx.start.column, ctx.start.column+len(ctx.getText()))
+        self.commit(ctx.start.column, ctx.start.column+self.length(ctx))
 
     def exitCvalueAtom(self, ctx:CuneiformParser.CvalueAtomContext):
-        self.commit(ctx.start.column, ctx.start.column+len(ctx.getText()))
+        self.commit(ctx.start.column, ctx.start.column+self.length(ctx))
 
     def exitDetValueAtom(self, ctx:CuneiformParser.DetValueAtomContext):
-        self.commit(ctx.start.column, ctx.start.column+len(ctx.getText()))
+        self.commit(ctx.start.column, ctx.start.column+self.length(ctx))
 
     def exitSignAtom(self, ctx:CuneiformParser.SignAtomContext):
-        self.commit(ctx.start.column, ctx.start.column+len(ctx.getText()))
+        self.commit(ctx.start.column, ctx.start.column+self.length(ctx))
 
     def exitMaybeSignAtom(self, ctx:CuneiformParser.MaybeSignAtomContext):
-        self.commit(ctx.start.column, ctx.start.column+len(ctx.getText()))
+        self.commit(ctx.start.column, ctx.start.column+self.length(ctx))
+    
+    def length(self, ctx):
+        # The span of the atom's tokens, unless recovery has dropped characters or conjured tokens
+        if self.errorListener.recovered or ctx.stop is None or ctx.stop.tokenIndex < ctx.start.tokenIndex:
+            return len(ruleText(ctx))
+        return ctx.stop.stop-ctx.start.start+1
     
     def exitBreakAtom(self, ctx:CuneiformParser.BreakAtomContext):
         self.commit(ctx.start.column, ctx.stop.column)
@@ -311,7 +560,7 @@ class Listener(CuneiformListener):
     def exitSignSpec(self, ctx:CuneiformParser.SignSpecContext):
         self.spec = False
         if self.signSpec and self.sign_type == 'number':
-            if not numberSigns.fullmatch(self.signSpec):
+            if self.signSpec not in numberSigns:
                 self.errorListener.syntaxError(None, None, ctx.start.line, ctx.start.column, f'Invalid number specification: {self.signSpec}', None)
             self.value += '('+self.signSpec+')'
             self.signSpec = ''
@@ -344,10 +593,11 @@ class Listener(CuneiformListener):
             self.value += '/'
             
     def exitSignOp(self, ctx:CuneiformParser.SignOpContext):
+        text = tokenText(ctx)
         if self.spec:
-            self.signSpec += ctx.getText()
+            self.signSpec += text
         else:
-            self.value += ctx.getText()
+            self.value += text
 
     def exitLparenOp(self, ctx:CuneiformParser.LparenOpContext):
         if self.spec:
@@ -370,12 +620,12 @@ class Listener(CuneiformListener):
     def exitValueT(self, ctx:CuneiformParser.ValueTContext):
         if self.col < 0:
             self.col = ctx.start.column
-        self.value += self.processInternalConditions(ctx.getText().lower(), ctx.start.line, self.col)
+        self.value += self.processInternalConditions(tokenText(ctx).lower(), ctx.start.line, self.col)
 
     def exitCvalueT(self, ctx:CuneiformParser.CvalueTContext):
         if self.col < 0:
             self.col = ctx.start.column
-        self.value += self.processInternalConditions(ctx.getText().lower(), ctx.start.line, self.col)
+        self.value += self.processInternalConditions(tokenText(ctx).lower(), ctx.start.line, self.col)
 
     def exitDT(self, ctx:CuneiformParser.DTContext):
         if self.col < 0:
@@ -388,20 +638,22 @@ class Listener(CuneiformListener):
         self.value += 'II'
 
     def exitSignT(self, ctx:CuneiformParser.SignTContext):
+        text = tokenText(ctx)
         if self.col < 0:
             self.col = ctx.start.column
         if self.spec:
-            self.signSpec += ctx.getText()
+            self.signSpec += text
         else:
-            self.value += self.processInternalConditions(ctx.getText(), ctx.start.line, self.col)
+            self.value += self.processInternalConditions(text, ctx.start.line, self.col)
 
     def exitNnsignT(self, ctx:CuneiformParser.NnsignTContext):
+        text = tokenText(ctx)
         if self.col < 0:
             self.col = ctx.start.column
         if self.spec:
-            self.signSpec += ctx.getText()
+            self.signSpec += text
         else:
-            self.value += self.processInternalConditions(ctx.getText(), ctx.start.line, self.col)
+            self.value += self.processInternalConditions(text, ctx.start.line, self.col)
 
     def exitNumberT(self, ctx:CuneiformParser.NumberTContext):
         if self.col < 0:
@@ -409,10 +661,10 @@ class Listener(CuneiformListener):
         if ctx.N():
             self.value += 'N'
         else:
-            self.value += ctx.getText()
+            self.value += tokenText(ctx)
 
     def exitNumberSpec(self, ctx:CuneiformParser.SignSpecContext):
-        self.value += re.sub(r'[xX]', '×', ctx.getText())
+        self.value += ruleText(ctx).translate(TIMES)
 
     def exitXT(self, ctx:CuneiformParser.XTContext):
         if self.col < 0:
@@ -438,46 +690,50 @@ class Listener(CuneiformListener):
     def exitHdividerT(self, ctx:CuneiformParser.HdividerTContext):
         if self.col < 0:
             self.col = ctx.start.column
-        self.value += ctx.getText()
+        self.value += tokenText(ctx)
 
     def exitVdividerT(self, ctx:CuneiformParser.VdividerTContext):
         if self.col < 0:
             self.col = ctx.start.column
-        self.value += ctx.getText() if ctx.getText() else '='
+        text = tokenText(ctx)
+        self.value += text if text else '='
 
 
     def exitMod(self, ctx:CuneiformParser.ModContext):
+        text = tokenText(ctx)
         if self.spec:
-            self.signSpec += ctx.getText()
+            self.signSpec += text
         elif self.sign_type == 'sign':
-            self.value += ctx.getText()
+            self.value += text
         else:
-            self.crits += ctx.getText()
+            self.crits += text
 
     def exitVariant(self, ctx:CuneiformParser.VariantContext):
+        text = tokenText(ctx)
         if self.spec:
-            self.signSpec += ctx.getText()
+            self.signSpec += text
         elif self.sign_type == 'sign':
-            self.value += ctx.getText()
+            self.value += text
         else:
-            self.crits += ctx.getText()
+            self.crits += text
 
     def exitCrit(self, ctx:CuneiformParser.CritContext):
-        if ctx.getText() == '#':
+        text = tokenText(ctx)
+        if text == '#':
             self.processHashCondition(ctx.start.line, ctx.start.column)
         elif self.sign_type == 'number':
-            self.value += ctx.getText()
+            self.value += text
         else:
-            self.crits += ctx.getText()
+            self.crits += text
 
     def exitPlusCrit(self, ctx: CuneiformParser.PlusCritContext):
         self.value += '+'
 
     def exitComment(self, ctx:CuneiformParser.CommentContext):
-        self.comments.append(ctx.getText()[1:-1].replace('\\', r'\\'))
+        self.comments.append(ruleText(ctx)[1:-1].replace('\\', r'\\'))
 
     def exitCompoundComment(self, ctx:CuneiformParser.CompoundCommentContext):
-        self.compoundComments.append(ctx.getText()[1:-1].replace('\\', r'\\'))
+        self.compoundComments.append(ruleText(ctx)[1:-1].replace('\\', r'\\'))
 
 
     # Separators
@@ -495,12 +751,15 @@ class Listener(CuneiformListener):
     # Newline
 
     def nl(self, ctx):
+        self.endLine(ctx.start.line, ctx.start.column)
+
+    def endLine(self, line, column):
         self.line_no += 1
         if self.condition != 'intact':
-            self.errorListener.syntaxError(None, None, ctx.start.line, ctx.start.column, 'Unclosed condition bracket', None)
+            self.errorListener.syntaxError(None, None, line, column, 'Unclosed condition bracket', None)
             self.condition = 'intact'
         if self.logogramm:
-            self.errorListener.syntaxError(None, None, ctx.start.line, ctx.start.column, 'Unpaired underscores', None)
+            self.errorListener.syntaxError(None, None, line, column, 'Unpaired underscores', None)
             self.logogramm = False
 
     def exitNl(self, ctx:CuneiformParser.NlContext):
@@ -541,11 +800,11 @@ class Listener(CuneiformListener):
             self.condition = 'intact'
 
     def processInternalConditions(self, value, line, col):
-        if re.search(r'[\[\]⸢⸣]', value):
+        if not INTERNAL_CONDITIONS.isdisjoint(value):
             for i, c in enumerate(value):
                 if c in '[]⸢⸣':
                     self.processCondition(c, line, col+i)
-            value = re.sub(r'[\[\]⸢⸣]', '', value)
+            value = value.translate(STRIP_CONDITIONS)
             self.damaged = True
         return value
 
@@ -556,13 +815,35 @@ class Listener(CuneiformListener):
             self.damaged = True
 
     def exitOpenCondition(self, ctx:CuneiformParser.OpenConditionContext):
+        text = tokenText(ctx)
         if self.sign_type == 'number':
-            self.value += ctx.getText()
+            self.value += text
         else:
-            self.processCondition(ctx.getText(), ctx.start.line, ctx.start.column)
+            self.processCondition(text, ctx.start.line, ctx.start.column)
 
     def exitCloseCondition(self, ctx:CuneiformParser.CloseConditionContext):
+        text = tokenText(ctx)
         if self.sign_type == 'number':
-            self.value += ctx.getText()
+            self.value += text
         else:
-            self.processCondition(ctx.getText(), ctx.start.line, ctx.start.column)
\ No newline at end of file
+            self.processCondition(text, ctx.start.line, ctx.start.column)
+
+class ValidationListener(Listener):
+    # Keeps the state the semantic checks depend on, but collects no rows
+
+    def commit(self, start, stop):
+        self.resetSign()
+
+    def length(self, ctx):
+        return 0
+
+    def commitWord(self):
+        self.capitalized = False
+
+    def commitCompound(self):
+        self.compoundComments = []
+        self.pn_type = None
+
+    # Comments only end up in rows, back to the base class's methods, which the walk skips
+    exitComment = CuneiformListener.exitComment
+    exitCompoundComment = CuneiformListener.exitCompoundComment
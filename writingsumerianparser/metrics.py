@@ -0,0 +1,101 @@
+import json
+import time
+import tracemalloc
+
+
+PHASES = ['scan', 'lex', 'parse', 'walk', 'merge', 'tables', 'write']
+
+
+class Profile:
+    # Time spent in each phase of one text, and its size; built where the text is parsed
+
+    def __init__(self, identifier, memory=False):
+        self.identifier = identifier
+        self.seconds = {}
+        self.counts = {}
+        self.cached = False
+        self.peak = None
+        self.memory = memory
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.base = tracemalloc.get_traced_memory()[0]
+        self.t = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.add(phase, now-self.t)
+        self.t = now
+
+    def add(self, phase, seconds):
+        self.seconds[phase] = self.seconds.get(phase, 0) + seconds
+
+    def finish(self):
+        if self.memory:
+            self.peak = tracemalloc.get_traced_memory()[1] - self.base
+
+    def record(self):
+        return {
+            'identifier': self.identifier,
+            'cached': self.cached,
+            'seconds': self.seconds,
+            'total': sum(self.seconds.values()),
+            **self.counts,
+            'peak_memory': self.peak
+        }
+
+
+def printIdentifier(record):
+    print(record['identifier'])
+
+
+class Metrics:
+    # Receives the record of every parsed text, passes it to the callback and aggregates it into a summary
+
+    def __init__(self, callback=None, memory=False, slowest=10):
+        self.callback = callback
+        self.memory = memory
+        self.slowest = slowest
+        self.records = []
+
+    def add(self, record):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def summary(self):
+        records = [x for x in self.records if not x['cached']]
+        totals = sorted(x['total'] for x in records)
+        seconds = sum(totals)
+        tokens = sum(x.get('tokens', 0) for x in records)
+
+        def percentile(p):
+            return totals[min(len(totals)-1, int(p/100*len(totals)))] if totals else None
+
+        return {
+            'texts': len(self.records),
+            'cached': len(self.records) - len(records),
+            'seconds': seconds,
+            'phases': {phase: sum(x['seconds'].get(phase, 0) for x in records) for phase in PHASES},
+            'lines': sum(x.get('lines', 0) for x in records),
+            'tokens': tokens,
+            'signs': sum(x.get('signs', 0) for x in records),
+            'errors': sum(x.get('errors', 0) for x in records),
+            'over_budget': sum(x.get('over_budget', 0) for x in records),
+            # With sll=True, the texts that passed the SLL stage and those parsed again with LL
+            'sll': sum(x.get('sll', 0) for x in records),
+            'll': sum(x.get('ll', 0) for x in records),
+            'tokens_per_second': tokens/seconds if seconds else None,
+            'percentiles': {f'p{p}': percentile(p) for p in [50, 90, 95, 99]},
+            'max': totals[-1] if totals else None,
+            'peak_memory': max((x['peak_memory'] for x in records if x['peak_memory'] is not None), default=None),
+            'slowest': sorted(records, key=lambda x: x['total'], reverse=True)[:self.slowest]
+        }
+
+    def save(self, path, records=False):
+        result = {'summary': self.summary()}
+        if records:
+            result['records'] = self.records
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
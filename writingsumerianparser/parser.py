@@ -1,10 +1,17 @@
 import antlr4
 from antlr4.error import DiagnosticErrorListener
 from antlr4 import BailErrorStrategy
+from antlr4.error.ErrorStrategy import DefaultErrorStrategy
 from antlr4 import PredictionMode
-import pandas as pd
+from antlr4.error.Errors import ParseCancellationException
+import collections
 from contextlib import ExitStack
+import functools
+import multiprocessing
+import os
 import re
+import threading
+import time
 
 try:
     from grammar.CuneiformLexer import CuneiformLexer
@@ -14,36 +21,45 @@ except:
     from .grammar.CuneiformParser import CuneiformParser
 
 try:
-    from .listener import Listener
+    from .listener import Listener, ValidationListener, SIGNS_SCHEMA, walkTree, listenerMethods
+    from .dfa import loadDFA
+    from .metrics import Profile, Metrics, printIdentifier
+    from .pgcopy import CopyWriter, TABLES, PREFIX, writeCopyTables, schemaTypes, frameColumns
+    from .columnar import ArrowWriter, SCHEMAS, writeArrowTables
+    from .dictionary import SignDictionary, encodedSchema
+    from .textindex import TEXT, TextIndex
+    from .scanner import CuneiformScanner
 except:
-    from listener import Listener
-
-SIGNS_COLS = [
-    'line_no', 
-    'word_no', 
-    'value', 
-    'sign_spec', 
-    'type',  
-    'indicator_type',
-    'phonographic',
-    'condition',
-    'stem',
-    'crits', 
-    'comment',
-    'newline',
-    'inverted',
-    'ligature',
-    'start_col',
-    'stop_col'
-]
+    from listener import Listener, ValidationListener, SIGNS_SCHEMA, walkTree, listenerMethods
+    from dfa import loadDFA
+    from metrics import Profile, Metrics, printIdentifier
+    from pgcopy import CopyWriter, TABLES, PREFIX, writeCopyTables, schemaTypes, frameColumns
+    from columnar import ArrowWriter, SCHEMAS, writeArrowTables
+    from dictionary import SignDictionary, encodedSchema
+    from textindex import TEXT, TextIndex
+    from scanner import CuneiformScanner
+
+SIGNS_COLS = [name for name, _ in SIGNS_SCHEMA]
+
+# The tables parseLines returns, in order, with their columns
+TABLE_NAMES = ['surfaces', 'blocks', 'lines', 'signs', 'compounds', 'words', 'sections', 'errors']
+COLUMNS = {table: [name for name, _ in SCHEMAS[table]] for table in TABLE_NAMES}
 
 class ErrorListener(antlr4.error.ErrorListener.ErrorListener):
 
     def __init__(self):
         self.errors = []
+        # Set once the lexer or parser has recovered from an error, the listener's own errors have no recognizer
+        self.recovered = False
+        # While parsing without a tree, the listener's errors are held back to follow the parser's as after a walk
+        self.deferred = None
+        # The number of errors of the lexer and parser, those of the listener follow them
+        self.parseErrors = None
 
     def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
-        self.errors.append([line-1, column, offendingSymbol.text.replace('\n', r'\n') if offendingSymbol else '', msg.replace('\n', r'\n')])
+        if recognizer is not None:
+            self.recovered = True
+        (self.deferred if recognizer is None and self.deferred is not None else self.errors).append([line-1, column, offendingSymbol.text.replace('\n', r'\n') if offendingSymbol else '', msg.replace('\n', r'\n')])
 
     #def reportAmbiguity(self, recognizer, dfa, startIndex, stopIndex, exact, ambigAlts, configs):
     #    print('Ambiguity:', dfa, exact, ambigAlts)
@@ -55,126 +71,465 @@ class ErrorListener(antlr4.error.ErrorListener.ErrorListener):
     #    print('Context:', dfa, prediction)
 
 
-def parse(text):
-    input = antlr4.InputStream(text)
-    lexer = CuneiformLexer(input)
-    stream = antlr4.CommonTokenStream(lexer)
-    parser = CuneiformParser(stream)
+predictionCounts = collections.Counter()
+
+
+class BudgetExceeded(Exception):
+    # outside: the lines around those the budget is for went over it, see walk
+
+    def __init__(self, msg, outside=False):
+        super().__init__(msg, outside)
+        self.outside = outside
+
+    def __str__(self):
+        return self.args[0]
+
+
+class Deadline(antlr4.tree.Tree.ParseTreeListener):
+    # Stops a parse past its time, checked at every token the parser consumes, in error recovery too.
+    # With lines, the tokens of those lines and of the others are each on a clock of their own.
+
+    def __init__(self, seconds, lines=None):
+        self.seconds = seconds
+        self.lines = lines
+        self.inside = None
+        self.end = time.perf_counter() + seconds
+
+    def check(self, token):
+        inside = True
+        if self.lines is not None:
+            inside = self.lines[0] <= token.line < self.lines[1]
+            if inside != self.inside:
+                self.inside = inside
+                self.end = time.perf_counter() + self.seconds
+        if time.perf_counter() > self.end:
+            raise BudgetExceeded(f'over {self.seconds}s', not inside)
+
+    def visitTerminal(self, node):
+        self.check(node.symbol)
+
+    def visitErrorNode(self, node):
+        self.check(node.symbol)
+
 
-    #parser._interp.predictionMode = PredictionMode.SLL
+class ActionParser(CuneiformParser):
+    # Calls the listener as rules are entered and completed, instead of building a parse tree to walk afterwards
+
+    def __init__(self, input):
+        super().__init__(input)
+        self.buildParseTrees = False
+
+    def setListener(self, listener):
+        self.listener = listener
+        self.methods = listenerMethods(type(listener))
+        # Tokens are still attached to the rule consuming them, the listener reads single tokens from there
+        self._parseListeners = [listener]
+
+    def reset(self):
+        # The listener is set again for the next pass, reset would fail to remove the tracer from it
+        self._parseListeners = None
+        super().reset()
+
+    def triggerEnterRuleEvent(self):
+        enter = self.methods[self._ctx.getRuleIndex()][0]
+        if enter is not None:
+            enter(self.listener, self._ctx)
+
+    def triggerExitRuleEvent(self):
+        if self._ctx.exception is not None and isinstance(self._errHandler, BailErrorStrategy):
+            # Unwinding a cancelled SLL pass, whose listener is discarded
+            return
+        exit = self.methods[self._ctx.getRuleIndex()][1]
+        if exit is not None:
+            exit(self.listener, self._ctx)
+
+    def match(self, ttype):
+        token = super().match(ttype)
+        if token.tokenIndex == -1:
+            # A token conjured by error recovery, kept where the parse tree would have it
+            self._ctx.addErrorNode(token)
+            position = self.getCurrentToken().tokenIndex
+            ctx = self._ctx
+            while ctx is not None:
+                if 'conjured' not in ctx.__dict__:
+                    ctx.conjured = []
+                ctx.conjured.append((position, token.text))
+                ctx = ctx.parentCtx
+        return token
+
+
+# The generated lexer, or the scanner emitting the same tokens from a table
+TOKENIZERS = {'antlr': CuneiformLexer, 'scanner': CuneiformScanner}
+
+
+class ParserPool(threading.local):
+    # A lexer and parser per thread and engine, given each text instead of built anew
+
+    def __init__(self):
+        self.parsers = {}
+
+    def get(self, text, tree=True, tokenizer='antlr'):
+        if (tree, tokenizer) not in self.parsers:
+            lexer = TOKENIZERS[tokenizer](antlr4.InputStream(''))
+            stream = antlr4.CommonTokenStream(lexer)
+            self.parsers[tree, tokenizer] = lexer, stream, CuneiformParser(stream) if tree else ActionParser(stream)
+        lexer, stream, parser = self.parsers[tree, tokenizer]
+        lexer.inputStream = antlr4.InputStream(text)
+        stream.setTokenSource(lexer)
+        # A deadline left by the last walk, reset would fail on it
+        parser.removeParseListeners()
+        parser.setTokenStream(stream)
+        # Left behind by a parse that raised, the root context would otherwise take it as its invoking state
+        parser.state = -1
+        parser._interp.predictionMode = PredictionMode.LL
+        parser._errHandler = DefaultErrorStrategy()
+        return lexer, stream, parser
+
+
+parsers = ParserPool()
+
+
+def walk(text, sll=False, state=None, listener=Listener, tree=True, profile=None, tokenizer='antlr', timeLimit=None, tokenLimit=None, budgetLines=None):
+    # With budgetLines (first, stop), the limits are for the tokens of lines first to stop-1, counted from 1,
+    # the tokens of the other lines are under the same limits of their own
+    lexer, stream, parser = parsers.get(text, tree, tokenizer)
 
     #parser.setTrace(True)
 
     errorListener = ErrorListener()
     lexer.removeErrorListeners()
     lexer.addErrorListener(errorListener)
-    parser.removeErrorListeners()        
-    #parser.errHandler = BailErrorStrategy()
-    parser.addErrorListener(errorListener)
-
-    tree = parser.text()
-    listener = Listener(errorListener)
-    walker = antlr4.ParseTreeWalker()
-    walker.walk(listener, tree)
-
-    signs =     pd.DataFrame(listener.signs,columns=SIGNS_COLS)
-    compounds = pd.DataFrame(listener.compounds,
-                             columns=['pn_type', 
-                                      'language',
-                                      'section_no',
-                                      'comment'])
-    compounds['section_no'] = compounds['section_no'].astype('Int64', copy=False)
-    compounds['section_no'].replace(-1, pd.NA, inplace=True)
-    words =     pd.DataFrame(listener.words,
-                             columns=['compound_no', 
-                                      'capitalized'])
-    sections =  pd.DataFrame(listener.sections,
-                             columns=['section_name'])
-    errors =    pd.DataFrame(errorListener.errors,
-                             columns=['line_no', 
-                                      'column', 
-                                      'symbol', 
-                                      'msg'])
+    parser.removeErrorListeners()
+
+    if profile is not None:
+        # Lexed up front to time it apart from parsing
+        stream.fill()
+        profile.counts['tokens'] = len(stream.tokens)-1
+        profile.lap('lex')
+    if tokenLimit is not None:
+        stream.fill()
+        count = len(stream.tokens)-1
+        if budgetLines is not None:
+            inside = sum(1 for token in stream.tokens[:-1] if budgetLines[0] <= token.line < budgetLines[1])
+            if count-inside > tokenLimit:
+                raise BudgetExceeded(f'{count-inside} tokens', True)
+            count = inside
+        if count > tokenLimit:
+            raise BudgetExceeded(f'{count} tokens')
+    deadline = Deadline(timeLimit, budgetLines) if timeLimit is not None else None
+
+    def start():
+        result = listener(errorListener)
+        if state is not None:
+            result.setState(state)
+        if not tree:
+            errorListener.deferred = []
+            parser.setListener(result)
+        if deadline is not None:
+            if tree:
+                parser.removeParseListeners()
+            parser.addParseListener(deadline)
+        return result
+
+    done = False
+    if sll:
+        # Cheap SLL pass first, only texts that fail it are parsed again with full LL
+        parser._interp.predictionMode = PredictionMode.SLL
+        parser._errHandler = BailErrorStrategy()
+        # Without a tree the listener already sees the rules of a failing pass, it then starts over
+        result = start()
+        try:
+            root = parser.text()
+            done = True
+            predictionCounts['sll'] += 1
+            if profile is not None:
+                profile.counts['sll'] = 1
+        except ParseCancellationException:
+            # Counted here for this process, in the profile for texts parsed in pool workers
+            predictionCounts['ll'] += 1
+            if profile is not None:
+                profile.counts['ll'] = 1
+            parser._interp.predictionMode = PredictionMode.LL
+            parser._errHandler = DefaultErrorStrategy()
+            parser.reset()
+
+    if not done:
+        parser.addErrorListener(errorListener)
+        result = start()
+        root = parser.text()
+
+    if profile is not None:
+        profile.lap('parse')
+    errorListener.parseErrors = len(errorListener.errors)
+    if tree:
+        walkTree(result, root)
+    else:
+        errorListener.errors.extend(errorListener.deferred)
+        errorListener.deferred = None
+    if profile is not None:
+        profile.lap('walk')
+    return result
+
+
+def makeFrame(columns, extra=()):
+    import numpy as np
+    import pandas as pd
+
+    data = {}
+    for (name, kind), buffer in zip(columns.schema, columns.buffers):
+        if kind == 'int':
+            data[name] = np.array(buffer, dtype=np.int64)
+        elif kind == 'bool':
+            data[name] = np.array(buffer, dtype=bool)
+        elif kind == 'flag':
+            codes = np.array(buffer, dtype=np.int8)
+            data[name] = pd.arrays.BooleanArray(codes == 1, codes < 0)
+        elif kind == 'nullable':
+            data[name] = pd.array(buffer, dtype='Int64')
+        elif isinstance(kind, list):
+            data[name] = pd.Categorical.from_codes(np.array(buffer, dtype=np.int8), categories=kind)
+        else:
+            data[name] = pd.Series(buffer, dtype=object)
+    for name, buffer in extra:
+        data[name] = np.array(buffer, dtype=np.int64)
+    return pd.DataFrame(data)
+
+
+def makeDict(columns, extra=()):
+    return {**{name: columns.decode(name) for name, _ in columns.schema}, **{name: list(buffer) for name, buffer in extra}}
+
+
+def rowsToTable(rows, columns, backend, index=None, select=None):
+    if select is not None and select != columns:
+        keep = [columns.index(x) for x in select]
+        rows = [[row[i] for i in keep] for row in rows]
+        columns = select
+    if backend == 'dict':
+        return {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+    import pandas as pd
+    return pd.DataFrame(rows, columns=columns, index=index)
+
+
+def makeTables(signs, compounds, words, sections, errors, backend='pandas'):
+    makeTable = makeDict if backend == 'dict' else makeFrame
+    signs =     makeTable(signs)
+    compounds = makeTable(compounds)
+    words =     makeTable(words)
+    sections =  rowsToTable([[x] for x in sections], ['section_name'], backend)
+    errors =    rowsToTable(errors, ['line_no', 'column', 'symbol', 'msg'], backend)
     return signs, compounds, words, sections, errors
-    
-
-def parseLines(lines):
-
-    SURFACE = re.compile(r'\s*@(?P<surface>obverse|reverse|top|bottom|left|right|surface|fragment)(?:\s+(?P<data>[^?!*]*))?(?:\s*(?P<comment>[?!*]+))?\s*')
-    BLOCK = re.compile(r'\s*@(?P<block>block|(?P<col>column|summary))(?:\s+(?P<data>(?(col)[1-9][0-9]*[a-g]?(?:\'+|[′″‴⁗])?(?:-[1-9][0-9]*[a-g]?(?:\'+|[′″‴⁗])?)?|[^?!*]*)))?(?:\s*(?P<comment>[?!*]+))?\s*')
-    COMMENT = re.compile(r'\s*#\s*(?P<comment>.*)')
-
-    class State:
-        def __init__(self):
-            self.validSurface = False
-            self.validBlock = False
-
-            self.surfaces = []
-            self.blocks = []
-            self.lines = []
-            self.content = []
-            self.lineNos = []
-            self.colOffsets = []
-
-            self.errorList = []
-
-            self.lastAdded = None
-
-        def convertToPrimes(text):
-            if text is not None:
-                text = text.replace("''''", "⁗")
-                text = text.replace("'''", "‴")
-                text = text.replace("''", "″")
-                text = text.replace("'", "′")
-            return text
-
-        def addSurface(self, surface, data, comment):
-            self.surfaces.append([surface, data, comment])
-            self.validSurface = True
-            self.validBlock = False
-            self.lastAdded = self.surfaces[-1]
-
-        def addBlock(self, block, data, comment):
-            if not self.validSurface:
-                self.addSurface('surface', None, None)
-            self.validBlock = True
-            self.blocks.append([len(self.surfaces)-1, block or None, State.convertToPrimes(data), comment])
-            self.lastAdded = self.blocks[-1]
-
-        def addLine(self, line, comment, content, lineNo):
-            if not self.validBlock:
-                self.addBlock('block', None, None)
-            self.lines.append([len(self.blocks)-1, State.convertToPrimes(line), comment])
-            self.content.append(content.strip())
-            self.lineNos.append(lineNo)
-            m = re.match(r'^\s*', content)
-            self.colOffsets.append(len(line)+1+m.end())
-            self.lastAdded = self.lines[-1]
-
-        def addError(self, line, column, symbol, msg):
-            self.errorList.append([line, column, symbol, msg])
-
-        def parse(self):
-            lineInfo = pd.DataFrame({
-                'line_no': list(range(len(self.lineNos))), 
-                'line_no_code': self.lineNos, 
-                'colOffset': self.colOffsets})
-
-            signs, self.compounds, self.words, self.sections, errors = parse('\n'.join(self.content))
-            signs = signs.merge(lineInfo, on='line_no')
-            signs['start_col_code'] = signs['start_col'] + signs['colOffset']
-            signs['stop_col_code'] = signs['stop_col'] + signs['colOffset']
-            self.signs = signs[SIGNS_COLS+['line_no_code', 'start_col_code', 'stop_col_code']]
-            errors = errors.merge(lineInfo, on='line_no')
-            errors['line_no'] = errors['line_no_code']
-            errors['column'] = errors['column'] + errors['colOffset']
-            self.errors = pd.concat([
-                    pd.DataFrame(self.errorList, columns=['line_no', 'column', 'symbol', 'msg']), 
-                    errors[['line_no', 'column', 'symbol', 'msg']]
-                ], 
-                ignore_index=True).sort_values(['line_no', 'column'])
 
 
+def parse(text, sll=False, backend='pandas', tree=True, profile=None, tokenizer='antlr'):
+    listener = walk(text, sll, tree=tree, profile=profile, tokenizer=tokenizer)
+    tables = makeTables(listener.signs, listener.compounds, listener.words, listener.sections, listener.errorListener.errors, backend)
+    if profile is not None:
+        profile.lap('tables')
+        profile.counts.update(lines=listener.line_no+1, signs=len(listener.signs), errors=len(listener.errorListener.errors))
+    return tables
+
+
+def projection(columns):
+    # The tables and columns asked for, {table: [column, ...] or None for all of them} or a list of tables,
+    # as the columns of each table asked for in the order of the full table. None stands for everything.
+    if columns is None:
+        return None
+    if not isinstance(columns, dict):
+        columns = dict.fromkeys(columns)
+    result = {}
+    for table, names in columns.items():
+        if table not in COLUMNS:
+            raise ValueError(f'Unknown table: {table}')
+        if names is not None:
+            unknown = set(names) - set(COLUMNS[table])
+            if unknown:
+                raise ValueError(f'Unknown columns of {table}: {", ".join(sorted(unknown))}')
+        result[table] = [x for x in COLUMNS[table] if names is None or x in names]
+    return result
+
+
+def listenerColumns(columns):
+    # The columns of the listener's tables to collect for a projection: those asked for, and those
+    # the line numbers and columns in the code are computed from
+    if columns is None:
+        return None
+    needed = {table: list(columns.get(table, [])) for table in ['signs', 'compounds', 'words']}
+    if needed['signs']:
+        needed['signs'] += ['line_no', 'start_col', 'stop_col']
+    return needed
+
+
+SURFACE = re.compile(r'\s*@(?P<surface>obverse|reverse|top|bottom|left|right|surface|fragment)(?:\s+(?P<data>[^?!*]*))?(?:\s*(?P<comment>[?!*]+))?\s*')
+BLOCK = re.compile(r'\s*@(?P<block>block|(?P<col>column|summary))(?:\s+(?P<data>(?(col)[1-9][0-9]*[a-g]?(?:\'+|[′″‴⁗])?(?:-[1-9][0-9]*[a-g]?(?:\'+|[′″‴⁗])?)?|[^?!*]*)))?(?:\s*(?P<comment>[?!*]+))?\s*')
+COMMENT = re.compile(r'\s*#\s*(?P<comment>.*)')
+
+
+class State:
+    def __init__(self):
+        self.validSurface = False
+        self.validBlock = False
+
+        self.surfaces = []
+        self.blocks = []
+        self.lines = []
+        self.content = []
+        self.lineNos = []
+        self.colOffsets = []
+
+        self.errorList = []
+
+        self.lastAdded = None
+
+        # The tables and columns to build, see projection
+        self.columns = None
+
+    def convertToPrimes(text):
+        if text is not None:
+            text = text.replace("''''", "⁗")
+            text = text.replace("'''", "‴")
+            text = text.replace("''", "″")
+            text = text.replace("'", "′")
+        return text
+
+    def addSurface(self, surface, data, comment):
+        self.surfaces.append([surface, data, comment])
+        self.validSurface = True
+        self.validBlock = False
+        self.lastAdded = self.surfaces[-1]
+
+    def addBlock(self, block, data, comment):
+        if not self.validSurface:
+            self.addSurface('surface', None, None)
+        self.validBlock = True
+        self.blocks.append([len(self.surfaces)-1, block or None, State.convertToPrimes(data), comment])
+        self.lastAdded = self.blocks[-1]
+
+    def addLine(self, line, comment, content, lineNo):
+        if not self.validBlock:
+            self.addBlock('block', None, None)
+        self.lines.append([len(self.blocks)-1, State.convertToPrimes(line), comment])
+        self.content.append(content.strip())
+        self.lineNos.append(lineNo)
+        m = re.match(r'^\s*', content)
+        self.colOffsets.append(len(line)+1+m.end())
+        self.lastAdded = self.lines[-1]
+
+    def addError(self, line, column, symbol, msg):
+        self.errorList.append([line, column, symbol, msg])
+
+    def parse(self, profile=None, lineLimit=None, fallback='units', chunkProcesses=1, chunkLines=500, columns=None, **kwargs):
+        # Texts over lineLimit lines, tokenLimit tokens or timeLimit seconds of parsing are parsed again
+        # unit by unit within the same limits, or with fallback='fail' are left with one error.
+        # With chunkProcesses > 1 texts of at least twice chunkLines lines are parsed in chunks in parallel.
+        # With columns only those tables and columns are collected, see projection.
+        try:
+            from .session import Units, parseUnits, parseChunks
+        except:
+            from session import Units, parseUnits, parseChunks
+        if fallback not in ('units', 'fail'):
+            raise ValueError(f'Unknown fallback: {fallback}')
+        self.columns = projection(columns)
+        needed = listenerColumns(self.columns)
+        if self.columns is not None and not any(x in self.columns for x in ['signs', 'compounds', 'words', 'sections', 'errors']):
+            # Only the tables of the scan
+            units = Units(needed)
+            self.combine(units.signs, units.compounds, units.words, units.sections, units.errors)
+            return
+        # Without rows to collect, the listener only keeps the state the errors and sections depend on
+        listener = functools.partial(ValidationListener if needed is not None and not any(needed.values()) else Listener, columns=needed)
+        try:
+            if lineLimit is not None and len(self.content) > lineLimit:
+                raise BudgetExceeded(f'{len(self.content)} lines')
+            units = None
+            if chunkProcesses > 1 and len(self.content) >= 2*chunkLines:
+                units = parseChunks(self.content, chunkProcesses, chunkLines, needed, **kwargs)
+            if units is not None:
+                if profile is not None:
+                    profile.lap('parse')
+                self.combine(units.signs, units.compounds, units.words, units.sections, units.errors)
+            else:
+                listener = walk('\n'.join(self.content), listener=listener, profile=profile, **kwargs)
+                self.combine(listener.signs, listener.compounds, listener.words, listener.sections, listener.errorListener.errors)
+        except BudgetExceeded as e:
+            if profile is not None:
+                profile.counts['over_budget'] = 1
+                profile.lap('parse')
+            if fallback == 'units':
+                units = parseUnits(self.content, needed, **kwargs)
+                units.parseErrors.insert(0, [0, 0, '', f'Parse budget exceeded: {e}, parsed line by line'])
+            else:
+                units = Units(needed)
+                units.parseErrors.append([0, 0, '', f'Parse budget exceeded: {e}'])
+            self.combine(units.signs, units.compounds, units.words, units.sections, units.errors)
+        if profile is not None:
+            profile.lap('merge')
+
+    def combine(self, signs, compounds, words, sections, errors):
+        # Maps the line numbers and columns of the joined content back to the code lines
+        lines = range(len(self.lineNos))
+        if signs.schema and any(x not in lines for x in signs.line_no):
+            signs = signs.take([i for i, x in enumerate(signs.line_no) if x in lines])
+        self.compounds = compounds
+        self.words = words
+        self.sectionNames = sections
+        self.signs = signs
+        codes = COLUMNS['signs'] if self.columns is None else self.columns.get('signs', [])
+        self.signCodes = []
+        if 'line_no_code' in codes:
+            self.signCodes.append(('line_no_code', [self.lineNos[x] for x in signs.line_no]))
+        if 'start_col_code' in codes:
+            self.signCodes.append(('start_col_code', [x + self.colOffsets[line] for x, line in zip(signs.start_col, signs.line_no)]))
+        if 'stop_col_code' in codes:
+            self.signCodes.append(('stop_col_code', [x + self.colOffsets[line] for x, line in zip(signs.stop_col, signs.line_no)]))
+        self.combineErrors(errors)
+
+    def combineErrors(self, errors):
+        lines = range(len(self.lineNos))
+        errors = self.errorList + [[self.lineNos[line], column + self.colOffsets[line], symbol, msg] for line, column, symbol, msg in errors if line in lines]
+        self.errorOrder = sorted(range(len(errors)), key=lambda i: errors[i][:2])
+        self.errors = [errors[i] for i in self.errorOrder]
+
+    def tables(self, backend='pandas', built=None):
+        # built: any of the signs, compounds and words tables already made from these rows
+        built = built or {}
+        if self.columns is not None:
+            return self.projectedTables(backend, built)
+        makeTable = makeDict if backend == 'dict' else makeFrame
+        surfaces = rowsToTable(self.surfaces, ['surface', 'data', 'comment'], backend)
+        blocks = rowsToTable(self.blocks, ['surface_no', 'block', 'data', 'comment'], backend)
+        lines = rowsToTable(self.lines, ['block_no', 'line', 'comment'], backend)
+        signs = built['signs'] if 'signs' in built else makeTable(self.signs, self.signCodes)
+        compounds = built['compounds'] if 'compounds' in built else makeTable(self.compounds)
+        words = built['words'] if 'words' in built else makeTable(self.words)
+        sections = rowsToTable([[x, x] for x in self.sectionNames], ['section_name', 'composition'], backend)
+        # The pandas error table keeps the row labels it had before sorting
+        errors = rowsToTable(self.errors, ['line_no', 'column', 'symbol', 'msg'], backend, self.errorOrder)
+
+        return surfaces, blocks, lines, signs, compounds, words, sections, errors
+
+    def projectedTables(self, backend='pandas', built=None):
+        # The tables asked for with their columns, None in place of the others
+        built = built or {}
+        makeTable = makeDict if backend == 'dict' else makeFrame
+        columns = self.columns
+        tables = []
+        for table in TABLE_NAMES:
+            if table not in columns:
+                tables.append(None)
+            elif table in built:
+                tables.append(built[table])
+            elif table in ('signs', 'compounds', 'words'):
+                tables.append(makeTable(getattr(self, table).project(columns[table]), self.signCodes if table == 'signs' else ()))
+            elif table == 'sections':
+                tables.append(rowsToTable([[x, x] for x in self.sectionNames], COLUMNS[table], backend, None, columns[table]))
+            elif table == 'errors':
+                tables.append(rowsToTable(self.errors, COLUMNS[table], backend, self.errorOrder, columns[table]))
+            else:
+                tables.append(rowsToTable(getattr(self, table), COLUMNS[table], backend, None, columns[table]))
+        return tuple(tables)
+
+
+def scanLines(lines):
     state = State()
 
     for lineNo, line in enumerate(lines):
@@ -202,53 +557,270 @@ def parseLines(lines):
         content, *comment = re.split(r'\s+#\s*', rest, 1)
         comment = comment[0].strip() if comment else None
         state.addLine(line, comment if comment else None, content, lineNo)
-    
-    state.parse()
 
-    surfaces = pd.DataFrame(state.surfaces, columns=['surface', 'data', 'comment'])
-    blocks = pd.DataFrame(state.blocks, columns=['surface_no', 'block', 'data', 'comment'])
-    lines = pd.DataFrame(state.lines, columns=['block_no', 'line', 'comment'])
-    sections = state.sections
-    sections['composition'] = sections['section_name']
+    return state
 
-    return surfaces, blocks, lines, state.signs, state.compounds, state.words, sections, state.errors
 
+def parseLines(lines, backend='pandas', profile=None, **kwargs):
+    state = scanLines(lines)
+    if profile is not None:
+        profile.lap('scan')
+    state.parse(profile=profile, **kwargs)
+    tables = state.tables(backend)
+    if profile is not None:
+        profile.lap('tables')
+        profile.counts.update(lines=len(state.content), signs=len(state.signs), errors=len(state.errors))
+    return tables
 
-def parseText(text):
-    return parseLines(text.split('\n'))
 
+def parseText(text, **kwargs):
+    return parseLines(text.split('\n'), **kwargs)
 
-def parseFile(path, target, corpus):
 
-    def write(files, tables, identifier, corpus):
-        if tables is not None:
-            for of, table in zip(files, tables):
-                table.insert(0, 'index', table.index)
-                table.insert(0, 'transliterationIdentifier', corpus+identifier)
-                table.to_csv(of, index=False, header=False, sep=',', na_rep=r'\N')
+def validateLines(lines, sll=True, tree=False, **kwargs):
+    # The rows of the error table of parseLines, without building any other table. Parsing is most of
+    # the cost: texts that pass the SLL pass are not parsed again, those with errors get the full LL parse
+    state = scanLines(lines)
+    listener = walk('\n'.join(state.content), sll, listener=ValidationListener, tree=tree, **kwargs)
+    state.combineErrors(listener.errorListener.errors)
+    return state.errors
 
-    tables = ['surfaces', 'blocks', 'lines', 'signs', 'compounds', 'words', 'sections', 'errors']
-    filenames = target if isinstance(target, list) else [path.join(target, x+'csv') for x in tables]
-    transliterations = []
+
+def validateText(text, **kwargs):
+    return validateLines(text.split('\n'), **kwargs)
+
+
+def validateTexts(texts, processes=1, chunksize=1, dfa=None, **kwargs):
+    if processes == 1:
+        if dfa is not None:
+            loadDFA(dfa)
+        for text in texts:
+            yield _validateText(text, **kwargs)
+    else:
+        with multiprocessing.Pool(processes, loadDFA if dfa is not None else None, (dfa,)) as pool:
+            yield from throttledImap(pool, functools.partial(_validateText, **kwargs), texts, chunksize, processes)
+
+
+def _validateText(text, **kwargs):
+    identifier, lines = text
+    return identifier, validateLines(lines, **kwargs)
+
+
+def readTexts(f):
     identifier = None
     lines = []
+    for line in f:
+        m = TEXT.match(line)
+        if m:
+            if identifier is not None:
+                yield identifier, lines
+            identifier = m.group(1)
+            lines = []
+        else:
+            if line.strip() and identifier is None:
+                print(f'Warning: Line outside of text: "{line}".')
+            lines.append(line)
+    if identifier is not None:
+        yield identifier, lines
+
+
+def warmUp(path, limit=None, **kwargs):
+    # Parses a sample of texts to build the prediction DFA, to be stored with saveDFA
+    with open(path) as f:
+        for i, (identifier, lines) in enumerate(readTexts(f)):
+            if limit is not None and i >= limit:
+                break
+            scanLines(lines).parse(**kwargs)
+
+
+def parseTexts(texts, processes=1, chunksize=1, cache=None, dfa=None, metrics=None, **kwargs):
+    for identifier, tables, profile in _parseTexts(texts, processes, chunksize, cache, dfa, metrics, **kwargs):
+        if metrics is not None:
+            metrics.add(profile.record())
+        yield identifier, tables
+
+
+def _parseTexts(texts, processes=1, chunksize=1, cache=None, dfa=None, metrics=None, **kwargs):
+    if processes != 1 and kwargs.get('chunkProcesses', 1) > 1:
+        raise ValueError('Texts are parsed in processes already, chunkProcesses needs processes=1')
+    # Texts are profiled where they are parsed, their records are collected here
+    profile = metrics is not None
+    memory = profile and metrics.memory
+    if processes == 1:
+        if dfa is not None:
+            loadDFA(dfa)
+        for text in texts:
+            yield _parseText(text, cache, profile, memory, **kwargs)
+    else:
+        with multiprocessing.Pool(processes, loadDFA if dfa is not None else None, (dfa,)) as pool:
+            yield from throttledImap(pool, functools.partial(_parseText, cache=cache, profile=profile, memory=memory, **kwargs), texts, chunksize, processes)
+
+
+def throttledImap(pool, f, items, chunksize, processes):
+    # Pool.imap reads its input eagerly, keep at most a few chunks per worker in flight
+    window = threading.Semaphore(4*(processes or os.cpu_count() or 1)*chunksize)
+    stopped = threading.Event()
+    def throttle(items):
+        for item in items:
+            window.acquire()
+            if stopped.is_set():
+                return
+            yield item
+    try:
+        for result in pool.imap(f, throttle(items), chunksize):
+            window.release()
+            yield result
+    finally:
+        # Unblock the feeder thread if the caller stops early
+        stopped.set()
+        window.release()
+
+
+def fileTexts(stack, path, identifiers=None, index=None):
+    # With identifiers, only those texts are read, found through the index next to the corpus file.
+    # With an index, e.g. of a shard, only the texts of that index.
+    if identifiers is None and index is None:
+        return readTexts(stack.enter_context(open(path)))
+    return (index if index is not None else TextIndex.open(path)).texts(identifiers)
+
+
+def iterParseFile(path, processes=1, chunksize=1, cache=None, dfa=None, metrics=None, identifiers=None, index=None, **kwargs):
     with ExitStack() as stack:
-        f = stack.enter_context(open(path))
-        ofiles = [stack.enter_context(open(x, 'w')) for x in filenames[1:]]
-        for line in f:
-            m = re.match(r'^\s*@text\s+(.+)', line)
-            if m:
-                if identifier is not None:
-                    print(identifier)
-                    transliterations.append([identifier, corpus+identifier, corpus])
-                    write(ofiles, parseLines(lines), identifier, corpus)
-                identifier = m.group(1)
-                lines = []
-            else:
-                if line.strip() and identifier is None:
-                    print(f'Warning: Line outside of text: "{line}".')
-                lines.append(line)
-        print(identifier)
-        transliterations.append([identifier, corpus+identifier, corpus])
-        write(ofiles, parseLines(lines), identifier, corpus)
-    pd.DataFrame(transliterations).to_csv(filenames[0], index=False, header=False, sep=',', na_rep=r'\N')    
+        yield from parseTexts(fileTexts(stack, path, identifiers, index), processes, chunksize, cache, dfa, metrics, **kwargs)
+
+
+def validateFile(path, processes=1, chunksize=1, dfa=None, identifiers=None, **kwargs):
+    # The errors of each text, as (identifier, errors)
+    with ExitStack() as stack:
+        yield from validateTexts(fileTexts(stack, path, identifiers), processes, chunksize, dfa, **kwargs)
+
+
+def writeTables(files, tables, identifier, corpus):
+    if tables is not None:
+        for of, table in zip(files, tables):
+            table.insert(0, 'index', table.index)
+            table.insert(0, 'transliterationIdentifier', corpus+identifier)
+            table.to_csv(of, index=False, header=False, sep=',', na_rep=r'\N')
+
+
+def writeFrame(filename, frame, schema, format):
+    # A table of the whole run rather than of each text, schema giving the listener's kinds of its columns
+    if format == 'copy':
+        with CopyWriter(open(filename, 'wb'), schemaTypes(schema)) as writer:
+            writer.write(frameColumns(frame))
+    elif format in ('parquet', 'arrow'):
+        with ArrowWriter(filename, schema, format, prefix=False) as writer:
+            writer.write(frame)
+    else:
+        frame.to_csv(filename, index=False, header=False, sep=',', na_rep=r'\N')
+
+
+def parseFile(path, target, corpus, processes=1, chunksize=1, cache=None, delta=False, dfa=None, metrics=None, format='csv', rowGroupSize=65536, identifiers=None, dictionary=False, columns=None, index=None, **kwargs):
+    import pandas as pd
+
+    if delta and cache is None:
+        raise ValueError('delta needs a cache, which keeps the manifest of the last run')
+    if delta and index is not None and identifiers is None:
+        raise ValueError('delta keeps the manifest of the whole corpus, select the texts of an index by identifiers')
+    # Without metrics of their own, callers still see the identifier of each text as it is written
+    if metrics is None:
+        metrics = Metrics(printIdentifier)
+
+    def changed(texts, previous, manifest):
+        for identifier, lines in texts:
+            key = cache.key(lines, **kwargs)
+            manifest[identifier] = key
+            if previous.get(identifier) != key:
+                yield identifier, lines
+
+    tables = TABLE_NAMES
+    extension = {'csv': '.csv', 'copy': '.bin', 'parquet': '.parquet', 'arrow': '.arrow'}[format]
+    filenames = target if isinstance(target, list) else [os.path.join(target, x+extension) for x in ['transliterations']+tables]
+    copyTypes = {name: PREFIX+TABLES[name] for name in tables}
+    schemas = dict(SCHEMAS)
+    columns = projection(columns)
+    if columns is not None:
+        # Only the files of the tables asked for are written, with their columns
+        kwargs['columns'] = columns
+        filenames = filenames[:1] + [x for x, name in zip(filenames[1:], tables) if name in columns]
+        tables = [name for name in tables if name in columns]
+        copyTypes = {name: PREFIX+[x for x in TABLES[name] if x[0] in columns[name]] for name in tables}
+        schemas.update({name: [x for x in SCHEMAS[name] if x[0] in columns[name]] for name in tables})
+    if dictionary:
+        # The signs table refers to the strings of a few of its columns by ids into dictionaries of the
+        # whole run, written next to the other tables. With delta the ids are kept from earlier runs.
+        signs = SignDictionary(cache.loadManifest(corpus+'\0dictionary') if delta else None)
+        if 'signs' in copyTypes:
+            copyTypes['signs'] = encodedSchema(copyTypes['signs'], 'integer')
+        schemas['signs'] = encodedSchema(schemas['signs'], 'nullable')
+    transliterations = []
+    with ExitStack() as stack:
+        texts = fileTexts(stack, path, identifiers, index)
+        if format == 'copy':
+            # PostgreSQL binary COPY, load with COPY ... FROM ... WITH (FORMAT binary)
+            ofiles = [stack.enter_context(CopyWriter(open(x, 'wb'), copyTypes[name])) for x, name in zip(filenames[1:], tables)]
+            write = writeCopyTables
+        elif format in ('parquet', 'arrow'):
+            # Typed columns, with the texts batched into row groups of at least rowGroupSize rows
+            ofiles = [stack.enter_context(ArrowWriter(x, schemas[name], format, rowGroupSize)) for x, name in zip(filenames[1:], tables)]
+            write = writeArrowTables
+        else:
+            ofiles = [stack.enter_context(open(x, 'w')) for x in filenames[1:]]
+            write = writeTables
+        if delta:
+            # Only texts whose content or parser version changed since the last run are written
+            previous = cache.loadManifest(corpus)
+            manifest = {}
+            texts = changed(texts, previous, manifest)
+        for identifier, result, profile in _parseTexts(texts, processes, chunksize, cache, dfa, metrics, **kwargs):
+            transliterations.append([identifier, corpus+identifier, corpus])
+            profile.t = time.perf_counter()
+            if dictionary:
+                result = signs.encodeTables(result)
+            if columns is not None and result is not None:
+                result = [x for x in result if x is not None]
+            write(ofiles, result, identifier, corpus)
+            profile.lap('write')
+            metrics.add(profile.record())
+    writeFrame(filenames[0], pd.DataFrame(transliterations, columns=[name for name, _ in SCHEMAS['transliterations']]), SCHEMAS['transliterations'], format)
+    if dictionary:
+        directory = os.path.dirname(filenames[0])
+        for name, frame in signs.tables().items():
+            writeFrame(os.path.join(directory, name+extension), frame, SCHEMAS[name], format)
+    if delta:
+        if identifiers is None:
+            removed = previous.keys() - manifest.keys()
+        else:
+            # Only the selected texts were read, the others keep their entries of the last run
+            removed = [x for x in identifiers if x in previous and x not in manifest]
+            manifest = {**{x: key for x, key in previous.items() if x not in removed}, **manifest}
+        # The texts of the last run no longer in the corpus, to be deleted from the loaded tables
+        removed = sorted(removed)
+        for identifier in removed:
+            print(f'Removed: {identifier}')
+        frame = pd.DataFrame([[x, corpus+x, corpus] for x in removed], columns=[name for name, _ in SCHEMAS['transliterations']])
+        writeFrame(os.path.join(os.path.dirname(filenames[0]), 'removed'+extension), frame, SCHEMAS['transliterations'], format)
+        cache.saveManifest(corpus, manifest)
+        if dictionary:
+            cache.saveManifest(corpus+'\0dictionary', signs.strings)
+    if cache is not None:
+        cache.evict()
+
+
+def _parseText(text, cache=None, profile=False, memory=False, **kwargs):
+    identifier, lines = text
+    profile = Profile(identifier, memory) if profile else None
+    if cache is None:
+        tables = parseLines(lines, profile=profile, **kwargs)
+    else:
+        key = cache.key(lines, **kwargs)
+        tables = cache.get(key)
+        if tables is None:
+            tables = parseLines(lines, profile=profile, **kwargs)
+            cache.put(key, tables)
+        elif profile is not None:
+            profile.cached = True
+            profile.lap('cache')
+    if profile is not None:
+        profile.finish()
+    return identifier, tables, profile
@@ -0,0 +1,175 @@
+import itertools
+import struct
+
+try:
+    from .listener import SIGNS_SCHEMA, COMPOUNDS_SCHEMA, WORDS_SCHEMA
+    from .dictionary import ENCODED, encodedSchema
+except:
+    from listener import SIGNS_SCHEMA, COMPOUNDS_SCHEMA, WORDS_SCHEMA
+    from dictionary import ENCODED, encodedSchema
+
+
+# PostgreSQL's binary COPY format: a signature, flags and header extension length, then per row the
+# number of fields and each field as its length (-1 for NULL) and its bytes, then -1 as trailer
+
+SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+HEADER = SIGNATURE + struct.pack('>ii', 0, 0)
+TRAILER = struct.pack('>h', -1)
+NULL = struct.pack('>i', -1)
+
+
+def schemaTypes(schema):
+    # Categories are sent as their labels, which PostgreSQL also accepts for enum columns
+    return [(name, 'integer' if kind in ('int', 'nullable') else 'boolean' if kind in ('bool', 'flag') else 'text') for name, kind in schema]
+
+
+# Column types of the tables written by parseFile, after transliterationIdentifier (text) and index (integer)
+TABLES = {
+    'transliterations': [('transliterationIdentifier', 'text'), ('name', 'text'), ('corpus', 'text')],
+    'surfaces': [('surface', 'text'), ('data', 'text'), ('comment', 'text')],
+    'blocks': [('surface_no', 'integer'), ('block', 'text'), ('data', 'text'), ('comment', 'text')],
+    'lines': [('block_no', 'integer'), ('line', 'text'), ('comment', 'text')],
+    'signs': schemaTypes(SIGNS_SCHEMA) + [('line_no_code', 'integer'), ('start_col_code', 'integer'), ('stop_col_code', 'integer')],
+    'compounds': schemaTypes(COMPOUNDS_SCHEMA),
+    'words': schemaTypes(WORDS_SCHEMA),
+    'sections': [('section_name', 'text'), ('composition', 'text')],
+    'errors': [('line_no', 'integer'), ('column', 'integer'), ('symbol', 'text'), ('msg', 'text')],
+    # parseFile(dictionary=True)
+    **{table: [('id', 'integer'), (name, 'text')] for name, table in ENCODED.items()}
+}
+PREFIX = [('transliterationIdentifier', 'text'), ('index', 'integer')]
+
+
+def encodeInts(fmt):
+    s = struct.Struct('>i'+fmt)
+    size = s.size - 4
+    pack = s.pack
+    return lambda values: [NULL if x is None else pack(size, x) for x in values]
+
+
+def encodeBools(values):
+    fields = {None: NULL, False: b'\x00\x00\x00\x01\x00', True: b'\x00\x00\x00\x01\x01'}
+    return [fields[x] for x in values]
+
+
+def encodeTexts(values):
+    pack = struct.Struct('>i').pack
+    result = []
+    for x in values:
+        if x is None:
+            result.append(NULL)
+        else:
+            x = str(x).encode()
+            result.append(pack(len(x)) + x)
+    return result
+
+
+def decodeInts(fmt):
+    unpack = struct.Struct('>'+fmt).unpack
+    return lambda data: unpack(data)[0]
+
+
+ENCODERS = {
+    'smallint': encodeInts('h'),
+    'integer': encodeInts('i'),
+    'bigint': encodeInts('q'),
+    'boolean': encodeBools,
+    'text': encodeTexts
+}
+DECODERS = {
+    'smallint': decodeInts('h'),
+    'integer': decodeInts('i'),
+    'bigint': decodeInts('q'),
+    'boolean': lambda data: data != b'\x00',
+    'text': lambda data: data.decode()
+}
+
+
+class CopyWriter:
+
+    def __init__(self, f, types):
+        self.f = f
+        self.types = [kind for _, kind in types]
+        self.fieldCount = struct.pack('>h', len(types))
+        f.write(HEADER)
+
+    def write(self, columns):
+        if len(columns) != len(self.types):
+            raise ValueError(f'Expected {len(self.types)} columns, got {len(columns)}')
+        n = len(columns[0])
+        if n:
+            fields = [ENCODERS[kind](values) for kind, values in zip(self.types, columns)]
+            self.f.write(b''.join(itertools.chain.from_iterable(zip(itertools.repeat(self.fieldCount, n), *fields))))
+
+    def close(self):
+        self.f.write(TRAILER)
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def frameColumns(table):
+    # Values as Python objects, None for any kind of missing value, converted for the whole frame at once
+    values = table.to_numpy(dtype=object)
+    values[table.isna().to_numpy()] = None
+    return values.T.tolist()
+
+
+def writeCopyTables(writers, tables, identifier, corpus):
+    if tables is not None:
+        for writer, table in zip(writers, tables):
+            writer.write([[corpus+identifier]*len(table), table.index.tolist()] + frameColumns(table))
+
+
+def readCopy(f, types):
+    # Rows of a binary COPY file as tuples, with the column types it was written with
+    decoders = [DECODERS[kind] for _, kind in types]
+    if f.read(len(SIGNATURE)) != SIGNATURE:
+        raise ValueError('Not a binary COPY file')
+    flags, extension = struct.unpack('>ii', f.read(8))
+    f.read(extension)
+    while True:
+        fieldCount, = struct.unpack('>h', f.read(2))
+        if fieldCount == -1:
+            break
+        if fieldCount != len(decoders):
+            raise ValueError(f'Expected {len(decoders)} fields, got {fieldCount}')
+        row = []
+        for decode in decoders:
+            size, = struct.unpack('>i', f.read(4))
+            row.append(None if size == -1 else decode(f.read(size)))
+        yield tuple(row)
+
+
+def readCopyFile(path, table, dictionary=False, columns=None):
+    # Rows of a table written by parseFile(format='copy'), with dictionary and the table's columns as given to it
+    types = TABLES[table] if columns is None else [x for x in TABLES[table] if x[0] in columns]
+    types = types if table == 'transliterations' or table in ENCODED.values() else PREFIX + types
+    if dictionary and table == 'signs':
+        types = encodedSchema(types, 'integer')
+    with open(path, 'rb') as f:
+        yield from readCopy(f, types)
+
+
+def mergeCopyFiles(paths, filename):
+    # The rows of several COPY files with the same columns, one after the other in a single file
+    with open(filename, 'wb') as of:
+        of.write(HEADER)
+        for path in paths:
+            with open(path, 'rb') as f:
+                size = f.seek(0, 2)
+                f.seek(0)
+                if f.read(len(HEADER)) != HEADER:
+                    raise ValueError(f'Not a binary COPY file: {path}')
+                remaining = size - len(HEADER) - len(TRAILER)
+                while remaining > 0:
+                    data = f.read(min(remaining, 1 << 20))
+                    of.write(data)
+                    remaining -= len(data)
+                if f.read() != TRAILER:
+                    raise ValueError(f'Truncated COPY file: {path}')
+        of.write(TRAILER)
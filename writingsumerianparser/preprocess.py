@@ -1,17 +1,61 @@
+import functools
+import multiprocessing
 import re
 
+try:
+    from .parser import throttledImap
+except:
+    from parser import throttledImap
+
+SEPARATORS = re.compile(r'([\(\)]|"[^"]*"|_[^_]*_)')
+
 def preprocess(text, f):
-    parts = re.split(r'([\(\)]|"[^"]*"|_[^_]*_)', text)
-    res = ''
+    # Parts are replaced in the list and joined once, instead of concatenating the result part by part
+    parts = SEPARATORS.split(text)
     level = 0
     for i, part in enumerate(parts):
         if part:
             if i%2:
-                res += part
                 if part == '(':
                     level += 1
                 elif part == ')':
                     level -= 1
-            else:
-                res += f(part) if not level else part
-    return res
\ No newline at end of file
+            elif not level:
+                parts[i] = f(part)
+    return ''.join(parts)
+
+
+# The memoized callback of a worker process
+workerCache = None
+
+def startWorker(f, maxsize):
+    global workerCache
+    workerCache = functools.lru_cache(maxsize)(f)
+
+def preprocessText(text, cached=None):
+    # The result with the cache hits and misses it took, to be added up where the results are collected
+    cached = cached or workerCache
+    before = cached.cache_info()
+    result = preprocess(text, cached)
+    after = cached.cache_info()
+    return result, after.hits-before.hits, after.misses-before.misses
+
+def preprocessTexts(texts, f, maxsize=2**16, processes=1, chunksize=64, stats=None):
+    # Segments repeat across a corpus, f is called once per distinct segment as long as it stays in the
+    # cache, so it has to depend on the segment alone. stats, a dict, receives the hits and misses.
+    if stats is not None:
+        stats.setdefault('hits', 0)
+        stats.setdefault('misses', 0)
+    if processes == 1:
+        results = map(functools.partial(preprocessText, cached=functools.lru_cache(maxsize)(f)), texts)
+        yield from collect(results, stats)
+    else:
+        with multiprocessing.Pool(processes, startWorker, (f, maxsize)) as pool:
+            yield from collect(throttledImap(pool, preprocessText, texts, chunksize, processes), stats)
+
+def collect(results, stats):
+    for result, hits, misses in results:
+        if stats is not None:
+            stats['hits'] += hits
+            stats['misses'] += misses
+        yield result
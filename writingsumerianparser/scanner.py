@@ -0,0 +1,117 @@
+from antlr4.Lexer import Lexer
+from antlr4.Token import Token
+from antlr4.atn.ATNState import RuleStopState
+from antlr4.atn.Transition import RuleTransition
+
+try:
+    from grammar.CuneiformLexer import CuneiformLexer
+except:
+    from .grammar.CuneiformLexer import CuneiformLexer
+
+
+# The lexer's ATN turned into a DFA over characters, built as characters are seen. Each DFA state is
+# the set of ATN states reachable after the characters so far, with the stack of fragment rules they
+# were entered through. A state accepts the token of the first lexer rule that has completed.
+
+class ScannerTable:
+
+    def __init__(self, atn, ruleToTokenType):
+        self.atn = atn
+        self.ruleToTokenType = ruleToTokenType
+        self.ids = {}
+        self.configs = []
+        self.edges = []
+        self.accepts = []
+        self.start = self.add(frozenset(self.closure(atn.modeToStartState[Lexer.DEFAULT_MODE], (), set())))
+
+    def closure(self, state, stack, configs):
+        key = (state.stateNumber, stack)
+        if key in configs:
+            return configs
+        configs.add(key)
+        if isinstance(state, RuleStopState):
+            # Back to where the fragment was called from, the rule is complete when there is nothing to return to
+            if stack:
+                self.closure(self.atn.states[stack[-1]], stack[:-1], configs)
+            return configs
+        for transition in state.transitions:
+            if isinstance(transition, RuleTransition):
+                self.closure(transition.target, stack + (transition.followState.stateNumber,), configs)
+            elif transition.isEpsilon:
+                self.closure(transition.target, stack, configs)
+        return configs
+
+    def add(self, configs):
+        if configs not in self.ids:
+            rules = [self.atn.states[state].ruleIndex for state, stack in configs if not stack and isinstance(self.atn.states[state], RuleStopState)]
+            self.ids[configs] = len(self.configs)
+            self.configs.append(configs)
+            self.edges.append({})
+            self.accepts.append(self.ruleToTokenType[min(rules)] if rules else None)
+        return self.ids[configs]
+
+    def move(self, number, c):
+        # The next state on character c, or -1 if no token continues with it
+        symbol = ord(c)
+        configs = set()
+        for state, stack in self.configs[number]:
+            for transition in self.atn.states[state].transitions:
+                if not transition.isEpsilon and transition.matches(symbol, Lexer.MIN_CHAR_VALUE, Lexer.MAX_CHAR_VALUE):
+                    self.closure(transition.target, stack, configs)
+        result = self.add(frozenset(configs)) if configs else -1
+        self.edges[number][c] = result
+        return result
+
+
+table = None
+
+
+class CuneiformScanner(CuneiformLexer):
+    # Emits the same tokens as CuneiformLexer, the longest match with ties going to the earlier rule,
+    # from a table of character transitions instead of simulating the ATN for every character
+
+    def __init__(self, input=None, output=None):
+        global table
+        super().__init__(input, output)
+        if table is None:
+            table = ScannerTable(self.atn, self.atn.ruleToTokenType)
+
+    def nextToken(self):
+        data = self._input.strdata
+        start = self._input.index
+        if start >= len(data):
+            self._hitEOF = True
+            return self.emitEOF()
+
+        edges = table.edges
+        accepts = table.accepts
+        state = table.start
+        pos = start
+        end = len(data)
+        token = None
+        while pos < end:
+            c = data[pos]
+            target = edges[state].get(c)
+            if target is None:
+                target = table.move(state, c)
+            if target < 0:
+                break
+            state = target
+            pos += 1
+            if accepts[state] is not None:
+                token = accepts[state]
+                stop = pos
+        if token is None:
+            # Nothing matches, left to the generated lexer to report
+            return super().nextToken()
+
+        interp = self._interp
+        self._token = self._factory.create(self._tokenFactorySourcePair, token, None, Token.DEFAULT_CHANNEL, start, stop-1, interp.line, interp.column)
+        newlines = data.count('\n', start, stop)
+        if newlines:
+            interp.line += newlines
+            interp.column = stop - data.rfind('\n', start, stop) - 1
+        else:
+            interp.column += stop-start
+        self._input.seek(stop)
+        return self._token
@@ -0,0 +1,196 @@
+# A long-running parser, reading one JSON request per line from stdin or a Unix socket and answering
+# with one JSON line each:
+#
+#   {"id": 1, "text": "1.\tlugal-e"}                   -> {"id": 1, "tables": {"surfaces": {"surface": [...], ...}, ...}}
+#   {"id": 2, "text": "...", "mode": "validate"}        -> {"id": 2, "errors": [[line_no, column, symbol, msg], ...]}
+#   {"id": 3, "text": "...", "options": {"sll": true}}  -> options of parseText for this request
+#   {"id": 4, "text": "...", "options": {"columns": {"signs": ["value", "type"]}}}  -> only those tables and columns
+#
+# Failed requests are answered with {"id": ..., "error": "..."}.
+#
+#   python -m writingsumerianparser.server [--socket PATH] [--processes N] [--dfa PATH] [--sll] [--tree-free] [--tokenizer scanner]
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+
+try:
+    from .parser import parseText, validateText
+    from .dfa import loadDFA
+except:
+    from parser import parseText, validateText
+    from dfa import loadDFA
+
+
+TABLES = ['surfaces', 'blocks', 'lines', 'signs', 'compounds', 'words', 'sections', 'errors']
+OPTIONS = {'sll', 'tree', 'tokenizer', 'columns'}
+
+
+def handle(line, **defaults):
+    # One request line to one response line, without pandas: the tables are dicts of columns
+    identifier = None
+    try:
+        request = json.loads(line)
+        identifier = request.get('id')
+        options = request.get('options') or {}
+        unknown = options.keys() - OPTIONS
+        if unknown:
+            raise ValueError(f'Unknown options: {", ".join(sorted(unknown))}')
+        options = {**defaults, **options}
+        mode = request.get('mode', 'parse')
+        if mode not in ('parse', 'validate'):
+            raise ValueError(f'Unknown mode: {mode}')
+        if mode == 'validate':
+            if 'columns' in options:
+                raise ValueError('columns is an option of parse requests')
+            response = {'id': identifier, 'errors': validateText(request['text'], **options)}
+        else:
+            tables = parseText(request['text'], backend='dict', **options)
+            response = {'id': identifier, 'tables': {name: x for name, x in zip(TABLES, tables) if x is not None}}
+    except Exception as e:
+        response = {'id': identifier, 'error': f'{type(e).__name__}: {e}'}
+    return json.dumps(response, ensure_ascii=False) + '\n'
+
+
+class Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(self.server.respond(line.decode()).encode())
+                self.wfile.flush()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path=None, processes=1, dfa=None, input=None, output=None, **options):
+    # On a Unix socket if a path is given, otherwise on stdin and stdout. With processes > 1 requests
+    # are parsed by a pool, each worker keeping its own DFA warm; otherwise in this process, one at a time.
+    respond = functools.partial(handle, **options)
+    pool = None
+    if processes != 1:
+        pool = multiprocessing.Pool(processes, loadDFA if dfa is not None else None, (dfa,))
+    elif dfa is not None:
+        loadDFA(dfa)
+    try:
+        if path is None:
+            input = input or sys.stdin
+            output = output or sys.stdout
+            lines = (x for x in input if x.strip())
+            for response in pool.imap(respond, lines) if pool else map(respond, lines):
+                output.write(response)
+                output.flush()
+        else:
+            if os.path.exists(path):
+                os.remove(path)
+            lock = threading.Lock()
+
+            def respondSerially(line):
+                with lock:
+                    return respond(line)
+
+            with Server(path, Handler) as server:
+                server.respond = (lambda line: pool.apply(respond, (line,))) if pool else respondSerially
+                try:
+                    server.serve_forever()
+                finally:
+                    os.remove(path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+class Client:
+    # Sends requests to a server on a Unix socket, or to one it starts as a subprocess on stdin and stdout
+
+    def __init__(self, path=None, **options):
+        self.process = None
+        self.socket = None
+        if path is None:
+            args = [sys.executable, '-m', 'writingsumerianparser.server'] + arguments(**options)
+            # The package is found where this module is, installed or not
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+            self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, encoding='utf-8', env=env)
+            self.writer = self.process.stdin
+            self.reader = self.process.stdout
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(path)
+            self.writer = self.socket.makefile('w', encoding='utf-8')
+            self.reader = self.socket.makefile('r', encoding='utf-8')
+        self.count = 0
+
+    def request(self, text, mode='parse', **options):
+        self.count += 1
+        request = {'id': self.count, 'text': text, 'mode': mode}
+        if options:
+            request['options'] = options
+        self.writer.write(json.dumps(request, ensure_ascii=False) + '\n')
+        self.writer.flush()
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('The server closed the connection')
+        response = json.loads(line)
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response
+
+    def parse(self, text, **options):
+        return self.request(text, **options)['tables']
+
+    def validate(self, text, **options):
+        return self.request(text, 'validate', **options)['errors']
+
+    def close(self):
+        self.writer.close()
+        if self.socket is not None:
+            self.reader.close()
+            self.socket.close()
+        if self.process is not None:
+            self.process.wait()
+            self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def arguments(processes=1, dfa=None, sll=False, tree=True, tokenizer='antlr'):
+    args = ['--processes', str(processes), '--tokenizer', tokenizer]
+    if dfa is not None:
+        args += ['--dfa', dfa]
+    if sll:
+        args.append('--sll')
+    if not tree:
+        args.append('--tree-free')
+    return args
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse transliterations sent as JSON lines')
+    parser.add_argument('--socket', help='Unix socket to listen on, instead of stdin and stdout')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--dfa', help='saved DFA to start from, see saveDFA')
+    parser.add_argument('--sll', action='store_true')
+    parser.add_argument('--tree-free', action='store_true')
+    parser.add_argument('--tokenizer', choices=['antlr', 'scanner'], default='antlr')
+    args = parser.parse_args()
+    serve(args.socket, args.processes, args.dfa, sll=args.sll, tree=not args.tree_free, tokenizer=args.tokenizer)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+import antlr4
+import functools
+import multiprocessing
+
+try:
+    from .parser import walk, scanLines, makeFrame, BudgetExceeded, projection, listenerColumns, TABLE_NAMES
+    from .listener import Listener, Columns, SIGNS_SCHEMA, COMPOUNDS_SCHEMA, WORDS_SCHEMA
+    from .scanner import CuneiformScanner
+except:
+    from parser import walk, scanLines, makeFrame, BudgetExceeded, projection, listenerColumns, TABLE_NAMES
+    from listener import Listener, Columns, SIGNS_SCHEMA, COMPOUNDS_SCHEMA, WORDS_SCHEMA
+    from scanner import CuneiformScanner
+
+
+# Stands in for the preceding line, so a unit is parsed from the same grammar state as within the whole text
+PREFIX = 'a'
+
+
+class UnitListener(Listener):
+
+    def __init__(self, errorListener, entry, prefix, stop, columns=None):
+        super().__init__(errorListener, columns)
+        self.entry = entry
+        self.prefix = prefix
+        self.stop = stop
+        self.start = None if prefix else self.mark()
+        self.end = None
+
+    def mark(self):
+        return len(self.signs), len(self.words), len(self.compounds), len(self.sections)
+
+    def endLine(self, line, column):
+        super().endLine(line, column)
+        if self.prefix and self.line_no == 1:
+            self.setState(self.entry)
+            self.start = self.mark()
+        if self.line_no == self.stop:
+            self.end = self.mark()
+            self.state = self.getState()
+
+
+class Unit:
+
+    def __init__(self, listener, offset, stop):
+        if listener.end is None:
+            listener.end = listener.mark()
+            listener.state = listener.getState()
+        signs, words, compounds, sections = listener.start
+        self.signs = listener.signs.slice(signs, listener.end[0])
+        self.signs.shift('line_no', -offset)
+        self.signs.shift('word_no', -words)
+        self.words = listener.words.slice(words, listener.end[1])
+        self.words.shift('compound_no', -compounds)
+        self.compounds = listener.compounds.slice(compounds, listener.end[2])
+        self.compounds.shift('section_no', -sections)
+        self.sections = listener.sections[sections:listener.end[3]]
+        errors = listener.errorListener.errors
+        self.parseErrors = [[row[0]-offset, *row[1:]] for row in errors[:listener.errorListener.parseErrors] if offset <= row[0] < stop]
+        self.listenerErrors = [[row[0]-offset, *row[1:]] for row in errors[listener.errorListener.parseErrors:] if offset <= row[0] < stop]
+        self.state = listener.state
+
+
+def split(content):
+    # Lines joined by a trailing separator, a leading tilde, an open $…$ divider
+    # or an empty line cannot be parsed on their own
+    first = 0
+    dollar = False
+    for i, line in enumerate(content):
+        dollar ^= line.count('$') % 2 == 1
+        if i+1 < len(content) and (dollar or not line or not content[i+1] or line[-1] in '-.,~' or content[i+1][0] == '~'):
+            continue
+        yield first, i+1
+        first = i+1
+
+
+def parseUnit(content, context, entry, prefix, columns=None, **kwargs):
+    # The unit is parsed with the following line as context, so that error recovery and
+    # lookahead at its end behave as in the whole text. Units whose parse does not end
+    # cleanly at that line break are merged with the next one.
+    offset = 1 if prefix else 0
+    stop = offset + len(content)
+    lines = ([PREFIX] if prefix else []) + content + ([context] if context is not None else [])
+    try:
+        # Parse budgets are for the lines of the unit
+        listener = walk('\n'.join(lines), listener=functools.partial(UnitListener, entry=entry, prefix=prefix, stop=stop if context is not None else None, columns=columns), budgetLines=(offset+1, stop+1), **kwargs)
+    except BudgetExceeded as e:
+        if not e.outside or context is None:
+            raise
+        # The context is over the budget on its own, the unit is parsed without it
+        return parseUnit(content, None, entry, prefix, columns, **kwargs)
+    if listener.start is None or context is not None and listener.end is None:
+        return None
+    for row in listener.errorListener.errors:
+        if row[0] < offset or row[0] >= stop and row[3].startswith('no viable alternative') and r'\n' in row[3]:
+            return None
+    return Unit(listener, offset, stop if context is not None else len(lines))
+
+
+class Units:
+    # The tables of consecutive units joined into those of the text, with the columns the units were collected with
+
+    def __init__(self, columns=None):
+        self.signs = Columns(SIGNS_SCHEMA, columns['signs'] if columns is not None else None)
+        self.compounds = Columns(COMPOUNDS_SCHEMA, columns['compounds'] if columns is not None else None)
+        self.words = Columns(WORDS_SCHEMA, columns['words'] if columns is not None else None)
+        self.sections = []
+        # Kept apart, so that the errors are in the order of a parse of the whole text
+        self.parseErrors = []
+        self.listenerErrors = []
+
+    @property
+    def errors(self):
+        return self.parseErrors + self.listenerErrors
+
+    def add(self, unit, first):
+        start = len(self.signs), len(self.words), len(self.compounds)
+        self.signs.extend(unit.signs)
+        self.signs.shift('line_no', first, start[0])
+        self.signs.shift('word_no', start[1], start[0])
+        self.words.extend(unit.words)
+        self.words.shift('compound_no', start[2], start[1])
+        self.compounds.extend(unit.compounds)
+        self.compounds.shift('section_no', len(self.sections), start[2])
+        self.sections.extend(unit.sections)
+        self.parseErrors.extend([row[0]+first, *row[1:]] for row in unit.parseErrors)
+        self.listenerErrors.extend([row[0]+first, *row[1:]] for row in unit.listenerErrors)
+
+    def mark(self):
+        return len(self.signs), len(self.words), len(self.compounds), len(self.sections), len(self.parseErrors), len(self.listenerErrors)
+
+    def slice(self, start, stop, first):
+        # The rows between two marks, numbered as those of a unit at line first
+        part = Units()
+        part.signs = self.signs.slice(start[0], stop[0])
+        part.signs.shift('line_no', -first)
+        part.signs.shift('word_no', -start[1])
+        part.words = self.words.slice(start[1], stop[1])
+        part.words.shift('compound_no', -start[2])
+        part.compounds = self.compounds.slice(start[2], stop[2])
+        part.compounds.shift('section_no', -start[3])
+        part.sections = self.sections[start[3]:stop[3]]
+        part.parseErrors = [[row[0]-first, *row[1:]] for row in self.parseErrors[start[4]:stop[4]]]
+        part.listenerErrors = [[row[0]-first, *row[1:]] for row in self.listenerErrors[start[5]:stop[5]]]
+        return part
+
+
+def parseUnits(content, columns=None, **kwargs):
+    # The fallback for texts over a parse budget: each unit is parsed within the same budget, from the
+    # state the previous one ended in. A unit over it is left out with an error, the next one starting
+    # from the state before it.
+    units = Units(columns)
+    entry = None
+    spans = list(split(content))
+    i = 0
+    while i < len(spans):
+        first, last = spans[i]
+        try:
+            unit = parseUnit(content[first:last], content[last] if last < len(content) else None, entry, first > 0, columns, **kwargs)
+        except BudgetExceeded as e:
+            units.parseErrors.append([first, 0, '', f'Parse budget exceeded: {e}, lines {first+1}-{last} left out'])
+            if entry is None:
+                # Nothing parsed yet, the next unit starts from the state of a new text
+                entry = Listener(None).getState()
+            i += 1
+            continue
+        if unit is None and i+1 < len(spans):
+            spans[i:i+2] = [(first, spans[i+1][1])]
+            continue
+        if unit is None:
+            units.parseErrors.append([first, 0, '', f'Lines {first+1}-{last} could not be parsed on their own'])
+        else:
+            units.add(unit, first)
+            entry = unit.state
+        i += 1
+    return units
+
+
+def entryStates(content, starts, entry=None):
+    # The listener's state at each of the given lines, from entry and the shifts before it. Conditions
+    # and underscores are closed at every line end, sign and compound state at every commit, so this
+    # is what a unit starts from unless recovery skipped a shift: an estimate, to be checked against
+    # the parse of the lines before.
+    lexer = CuneiformScanner(antlr4.InputStream('\n'.join(content)))
+    lexer.removeErrorListeners()
+    listener = Listener(None)
+    listener.col = -1
+    if entry is not None:
+        listener.setState(entry)
+    states = []
+    starts = iter(starts)
+    start = next(starts, None)
+    line = 0
+    depth = 0
+    for token in lexer.getAllTokens() + [None]:
+        if token is None or token.line-1 != line:
+            line = token.line-1 if token is not None else len(content)
+            depth = 0
+        while start is not None and start <= line:
+            states.append(listener.getState())
+            start = next(starts, None)
+        if token is None:
+            break
+        if depth < 0 or '\n' in token.text or token.type == lexer.SPACE:
+            # After an unmatched parenthesis recovery skips the rest of the line
+            continue
+        if token.text == '(':
+            depth += 1
+        elif token.text == ')':
+            depth -= 1
+        elif depth > 0:
+            pass
+        elif token.type == lexer.SHIFT:
+            try:
+                listener.shift(token.text)
+            except:
+                # An unknown shift, which recovery drops from the parse
+                pass
+        else:
+            # A compound follows, taking the shifts of proper nouns
+            listener.pn_type = None
+            listener.capitalized = False
+    return states
+
+
+def _parseChunk(chunk, **kwargs):
+    try:
+        return parseUnit(*chunk, **kwargs)
+    except BudgetExceeded as e:
+        return e
+
+
+def parseChunks(content, processes, chunkLines=500, columns=None, **kwargs):
+    # Groups of at least chunkLines lines parsed in parallel, each from the state estimated by
+    # entryStates. Where an estimate turns out wrong, the chunks from there on are estimated again
+    # from the state the chunk before ended in and parsed again; a chunk whose parse does not end
+    # cleanly is parsed again here with the rest of the text. The joined tables are those of the
+    # units parsed one after the other, None if the last of them does not parse on its own.
+    bounds = []
+    size = max(chunkLines, -(-len(content) // processes))
+    for first, last in split(content):
+        if bounds and last - bounds[-1][0] <= size:
+            bounds[-1][1] = last
+        else:
+            bounds.append([first, last])
+
+    def chunk(i, entry):
+        first, last = bounds[i]
+        return content[first:last], content[last] if last < len(content) else None, entry, first > 0
+
+    estimates = [None] + entryStates(content, [first for first, _ in bounds[1:]])
+    stale = object()
+    units = Units(columns)
+    entry = None
+    with multiprocessing.Pool(min(processes, len(bounds))) as pool:
+        parseChunk = functools.partial(_parseChunk, columns=columns, **kwargs)
+        results = pool.map(parseChunk, [chunk(i, x) for i, x in enumerate(estimates)])
+        i = 0
+        while i < len(bounds):
+            if estimates[i] is stale:
+                results[i] = parseChunk(chunk(i, entry))
+            elif estimates[i] != entry:
+                first = bounds[i][0]
+                estimates[i:] = [entry] + entryStates(content[first:], [x[0]-first for x in bounds[i+1:]], entry)
+                results[i:] = pool.map(parseChunk, [chunk(j, estimates[j]) for j in range(i, len(bounds))])
+            unit = results[i]
+            if isinstance(unit, BudgetExceeded):
+                raise unit
+            if unit is None:
+                if i+1 == len(bounds):
+                    return None
+                # Recovery took a line break, or the rest of the text, which would then be merged
+                # chunk by chunk, parsing the same lines over and over
+                bounds[i:] = [[bounds[i][0], bounds[-1][1]]]
+                estimates[i:] = [stale]
+                results[i:] = [None]
+                continue
+            units.add(unit, bounds[i][0])
+            entry = unit.state
+            i += 1
+    return units
+
+
+class ParseSession:
+
+    def __init__(self, text='', backend='pandas', columns=None, **kwargs):
+        self.backend = backend
+        self.columns = projection(columns)
+        self.needed = listenerColumns(self.columns)
+        self.kwargs = kwargs
+        self.lines = text.split('\n')
+        self.units = {}
+        # The units of the last update with their first lines, the joined rows and where each unit's start
+        self.order = []
+        self.merged = Units(self.needed)
+        self.marks = [self.merged.mark()]
+        self.tables = None
+        self.update()
+
+    def edit(self, start, stop, lines):
+        self.lines[start:stop] = lines
+        return self.update()
+
+    def setLine(self, lineNo, line):
+        return self.edit(lineNo, lineNo+1, [line])
+
+    def update(self):
+        state = scanLines(self.lines)
+        content = state.content
+
+        units = {}
+        order = []
+        changed = []
+        entry = None
+        spans = list(split(content))
+        i = 0
+        while i < len(spans):
+            first, last = spans[i]
+            key = (tuple(content[first:last]), content[last] if last < len(content) else None, entry, first > 0)
+            unit = units[key] if key in units else self.units[key] if key in self.units else parseUnit(list(key[0]), key[1], entry, key[3], self.needed, **self.kwargs)
+            units[key] = unit
+            if unit is None:
+                spans[i:i+2] = [(first, spans[i+1][1])]
+                continue
+            if key not in self.units:
+                changed.extend(state.lineNos[first:last])
+            entry = unit.state
+            i += 1
+            order.append((key, first, unit))
+
+        # The rows of the units before and after those that changed are taken from the last update
+        old = self.order
+        head = 0
+        while head < min(len(old), len(order)) and old[head][:2] == order[head][:2]:
+            head += 1
+        tail = 0
+        while tail < min(len(old), len(order)) - head and old[-1-tail][0] == order[-1-tail][0]:
+            tail += 1
+        merged = self.merged.slice(self.marks[0], self.marks[head], 0)
+        marks = self.marks[:head+1]
+        for key, first, unit in order[head:len(order)-tail]:
+            merged.add(unit, first)
+            marks.append(merged.mark())
+        if tail:
+            start = len(old) - tail
+            base = marks[-1]
+            merged.add(self.merged.slice(self.marks[start], self.marks[-1], old[start][1]), order[-tail][1])
+            marks.extend(tuple(x - y + z for x, y, z in zip(mark, self.marks[start], base)) for mark in self.marks[start+1:])
+
+        state.columns = self.columns
+        state.combine(merged.signs, merged.compounds, merged.words, merged.sections, merged.errors)
+        built = None
+        if self.tables is not None and self.backend == 'pandas' and state.signs is merged.signs:
+            built = self.splice(state, order, marks, head, tail)
+
+        # Only the units parsed in the last update are kept, the returned line numbers are those that had to be reparsed
+        self.units = units
+        self.order = order
+        self.merged = merged
+        self.marks = marks
+        self.tables = state.tables(self.backend, built)
+        return self.tables, sorted(set(changed))
+
+    def splice(self, state, order, marks, head, tail):
+        # The signs, words and compounds frames of the last update with the rows of the changed units replaced
+        # and those of the units after them renumbered
+        import numpy as np
+        import pandas as pd
+
+        start, stop = marks[head], marks[len(order)-tail]
+        last = self.marks[len(self.order)-tail]
+        lines = order[-tail][1] - self.order[-tail][1] if tail else 0
+        shifts = {
+            'signs': [('line_no', lines), ('word_no', stop[1]-last[1])],
+            'words': [('compound_no', stop[2]-last[2])],
+            'compounds': [('section_no', stop[3]-last[3])]
+        }
+        built = {}
+        for i, table in enumerate(['signs', 'words', 'compounds']):
+            frame = self.tables[TABLE_NAMES.index(table)]
+            if frame is None:
+                continue
+            columns = getattr(state, table).slice(start[i], stop[i])
+            if self.columns is not None:
+                columns = columns.project(self.columns[table])
+            rest = frame.iloc[last[i]:].copy()
+            for name, offset in shifts[table]:
+                if name in rest and offset:
+                    rest[name] += offset
+            codes = [(name, values[start[0]:stop[0]]) for name, values in state.signCodes] if table == 'signs' else ()
+            parts = [frame.iloc[:start[i]], makeFrame(columns, codes), rest]
+            frame = pd.concat([x for x in parts if len(x)] or parts[1:2], ignore_index=True)
+            if table == 'signs':
+                # The columns in the code lines, which follow any line and label before them
+                for name, values in state.signCodes:
+                    frame[name] = np.array(values, dtype=np.int64)
+            built[table] = frame
+        return built
@@ -0,0 +1,146 @@
+# Runs of one corpus spread over several machines. splitCorpus divides the corpus at its @text lines
+# into shards of consecutive texts and saves a manifest of the texts of each. parseShard parses one
+# shard with parseFile, wherever a copy of the corpus is, and mergeShards joins the files of all shards
+# into those a single parseFile run writes.
+#
+#   python -m writingsumerianparser.shards split corpus.atf 4 [--manifest corpus.atf.shards]
+#   python -m writingsumerianparser.shards parse corpus.atf.shards 0 out/0 corpus/ [--format copy] [--processes N] [--path corpus.atf]
+#   python -m writingsumerianparser.shards merge corpus.atf.shards out/0 out/1 out/2 out/3 --target out
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    from .parser import parseFile, TABLE_NAMES
+    from .pgcopy import mergeCopyFiles
+    from .columnar import mergeArrowFiles
+    from .textindex import TEXT, TextIndex
+except:
+    from parser import parseFile, TABLE_NAMES
+    from pgcopy import mergeCopyFiles
+    from columnar import mergeArrowFiles
+    from textindex import TEXT, TextIndex
+
+
+FORMATS = {'.csv': 'csv', '.bin': 'copy', '.parquet': 'parquet', '.arrow': 'arrow'}
+
+
+def splitCorpus(path, shards, manifest=None):
+    # The same corpus always gives the same shards: runs of about the same size in bytes
+    index = TextIndex.open(path)
+    manifest = manifest or path + '.shards'
+    data = {'corpus': path, 'size': index.size, 'shards': [x.entries for x in index.shards(shards)]}
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(manifest)))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, manifest)
+    return manifest
+
+
+def loadShards(manifest):
+    with open(manifest) as f:
+        return json.load(f)
+
+
+def shardIdentifiers(manifest):
+    # The identifiers of the texts of each shard
+    return [[identifier for identifier, _, _ in entries] for entries in loadShards(manifest)['shards']]
+
+
+def shardIndex(manifest, shard, path=None):
+    # The texts of a shard, in the copy of the corpus at path or where it was split. The copy is checked
+    # to have the @text lines of the shard where the manifest has them.
+    data = loadShards(manifest)
+    path = path or data['corpus']
+    entries = [tuple(x) for x in data['shards'][shard]]
+    if os.path.getsize(path) != data['size']:
+        raise ValueError(f'{path} is not the corpus the shards were made from')
+    with open(path, 'rb') as f:
+        for identifier, start, _ in entries:
+            f.seek(start)
+            header = TEXT.match(f.readline().decode().rstrip('\r\n'))
+            if header is None or header.group(1) != identifier:
+                raise ValueError(f'{path} is not the corpus the shards were made from, {identifier} is not at {start}')
+    return TextIndex(path, entries, data['size'])
+
+
+def parseShard(manifest, shard, target, corpus, path=None, **kwargs):
+    # delta and dictionary keep state over the whole run, which the shards do not share
+    if kwargs.get('delta') or kwargs.get('dictionary'):
+        raise ValueError('Shards are parsed without delta and dictionary')
+    index = shardIndex(manifest, shard, path)
+    parseFile(index.path, target, corpus, index=index, **kwargs)
+
+
+def mergeShards(manifest, sources, target, rowGroupSize=65536):
+    # The files of the shards, in the directories sources in the order of the shards, joined into target
+    shards = len(loadShards(manifest)['shards'])
+    if len(sources) != shards:
+        raise ValueError(f'Expected the outputs of {shards} shards, got {len(sources)}')
+    os.makedirs(target, exist_ok=True)
+    names = ['transliterations'] + TABLE_NAMES
+    for filename in sorted(os.listdir(sources[0])):
+        name, extension = os.path.splitext(filename)
+        if name not in names or extension not in FORMATS:
+            continue
+        paths = [os.path.join(x, filename) for x in sources]
+        missing = [x for x in paths if not os.path.exists(x)]
+        if missing:
+            raise ValueError(f'Missing: {", ".join(missing)}')
+        format = FORMATS[extension]
+        if format == 'copy':
+            mergeCopyFiles(paths, os.path.join(target, filename))
+        elif format in ('parquet', 'arrow'):
+            mergeArrowFiles(paths, os.path.join(target, filename), format, rowGroupSize, prefix=name != 'transliterations')
+        else:
+            with open(os.path.join(target, filename), 'wb') as of:
+                for path in paths:
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, of)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Split a corpus into shards, parse a shard, or merge the outputs of all shards')
+    commands = parser.add_subparsers(dest='command', required=True)
+    split = commands.add_parser('split')
+    split.add_argument('corpus')
+    split.add_argument('shards', type=int)
+    split.add_argument('--manifest', help='default: the corpus path + .shards')
+    parse = commands.add_parser('parse')
+    parse.add_argument('manifest')
+    parse.add_argument('shard', type=int)
+    parse.add_argument('target')
+    parse.add_argument('prefix', help='corpus prefix of the transliteration identifiers')
+    parse.add_argument('--path', help='the copy of the corpus on this machine, default: where it was split')
+    parse.add_argument('--format', choices=['csv', 'copy', 'parquet', 'arrow'], default='csv')
+    parse.add_argument('--row-group-size', type=int, default=65536)
+    parse.add_argument('--processes', type=int, default=1)
+    parse.add_argument('--chunksize', type=int, default=1)
+    parse.add_argument('--dfa', help='saved DFA to start from, see saveDFA')
+    parse.add_argument('--sll', action='store_true')
+    parse.add_argument('--tree-free', action='store_true')
+    parse.add_argument('--tokenizer', choices=['antlr', 'scanner'], default='antlr')
+    merge = commands.add_parser('merge')
+    merge.add_argument('manifest')
+    merge.add_argument('sources', nargs='+', help='the output directories of the shards, in order')
+    merge.add_argument('--target', required=True)
+    merge.add_argument('--row-group-size', type=int, default=65536)
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        manifest = splitCorpus(args.corpus, args.shards, args.manifest)
+        for i, identifiers in enumerate(shardIdentifiers(manifest)):
+            print(f'Shard {i}: {len(identifiers)} texts')
+    elif args.command == 'parse':
+        os.makedirs(args.target, exist_ok=True)
+        parseShard(args.manifest, args.shard, args.target, args.prefix, args.path, processes=args.processes, chunksize=args.chunksize,
+                   dfa=args.dfa, format=args.format, rowGroupSize=args.row_group_size, sll=args.sll, tree=not args.tree_free, tokenizer=args.tokenizer)
+    else:
+        mergeShards(args.manifest, args.sources, args.target, args.row_group_size)
+
+
+if __name__ == '__main__':
+    main()
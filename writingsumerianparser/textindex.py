@@ -0,0 +1,125 @@
+import io
+import json
+import mmap
+import os
+import re
+import tempfile
+
+
+TEXT = re.compile(r'^\s*@text\s+(.+)')
+
+
+class TextIndex:
+    # Byte ranges of the texts of a corpus file, from their @text line to the next one
+
+    def __init__(self, path, entries, size=None, mtime=None):
+        self.path = path
+        self.entries = entries
+        self.size = size
+        self.mtime = mtime
+        self.positions = {}
+        for i, (identifier, _, _) in enumerate(entries):
+            self.positions.setdefault(identifier, []).append(i)
+
+    def sidecar(path):
+        return path + '.index'
+
+    def build(path):
+        stat = os.stat(path)
+        starts = []
+        identifiers = []
+        with open(path, 'rb') as f:
+            if stat.st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    for match in re.finditer(rb'@text', m):
+                        start = m.rfind(b'\n', 0, match.start()) + 1
+                        if starts and start == starts[-1]:
+                            continue
+                        end = m.find(b'\n', match.start())
+                        # The same test as readTexts, on the decoded line
+                        line = m[start:len(m) if end < 0 else end].decode().rstrip('\r')
+                        header = TEXT.match(line)
+                        if header:
+                            starts.append(start)
+                            identifiers.append(header.group(1))
+        entries = [(identifier, start, end) for identifier, start, end in zip(identifiers, starts, starts[1:] + [stat.st_size])]
+        return TextIndex(path, entries, stat.st_size, stat.st_mtime_ns)
+
+    def load(path, sidecar=None):
+        # None if there is no index or the corpus changed since it was built
+        try:
+            with open(sidecar or TextIndex.sidecar(path)) as f:
+                data = json.load(f)
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        if data.get('size') != stat.st_size or data.get('mtime') != stat.st_mtime_ns:
+            return None
+        return TextIndex(path, [tuple(x) for x in data['texts']], data['size'], data['mtime'])
+
+    def open(path, sidecar=None):
+        index = TextIndex.load(path, sidecar)
+        if index is None:
+            index = TextIndex.build(path)
+            index.save(sidecar)
+        return index
+
+    def save(self, sidecar=None):
+        sidecar = sidecar or TextIndex.sidecar(self.path)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(sidecar)))
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'size': self.size, 'mtime': self.mtime, 'texts': self.entries}, f)
+        os.replace(tmp, sidecar)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, identifier):
+        return identifier in self.positions
+
+    def identifiers(self):
+        return [identifier for identifier, _, _ in self.entries]
+
+    def texts(self, identifiers=None):
+        # Texts as read by readTexts, all of them or those with the given identifiers, in file order
+        if identifiers is None:
+            entries = self.entries
+        else:
+            missing = [x for x in identifiers if x not in self.positions]
+            if missing:
+                raise KeyError(f'Not in {self.path}: {", ".join(missing[:10])}')
+            entries = [self.entries[i] for i in sorted({i for x in identifiers for i in self.positions[x]})]
+        return self.read(entries)
+
+    def read(self, entries):
+        with open(self.path, 'rb') as f:
+            for identifier, start, end in entries:
+                f.seek(start)
+                # Decoded and split into lines as open(path) would
+                lines = list(io.TextIOWrapper(io.BytesIO(f.read(end-start))))
+                yield identifier, lines[1:]
+
+    def split(self, parts):
+        # Consecutive runs of texts of about the same size in bytes, one list of identifiers per part
+        total = sum(end-start for _, start, end in self.entries)
+        result = [[] for _ in range(parts)]
+        seen = set()
+        done = 0
+        for identifier, start, end in self.entries:
+            # Repeated identifiers are parsed together with their first text
+            if identifier not in seen:
+                seen.add(identifier)
+                result[min(parts-1, done*parts//max(total, 1))].append(identifier)
+            done += end-start
+        return result
+
+    def shards(self, parts):
+        # Consecutive runs of texts of about the same size in bytes, as an index of each run. Unlike split
+        # repeated identifiers stay in place, so the runs one after the other are the whole file.
+        total = sum(end-start for _, start, end in self.entries)
+        result = [[] for _ in range(parts)]
+        done = 0
+        for entry in self.entries:
+            result[min(parts-1, done*parts//max(total, 1))].append(entry)
+            done += entry[2]-entry[1]
+        return [TextIndex(self.path, entries, self.size, self.mtime) for entries in result]